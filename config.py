@@ -27,6 +27,9 @@ IG_PASSWORD = os.getenv("IG_PASSWORD")
 IG_ACC_ID = os.getenv("IG_ACC_ID")
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Optional stronger model that re-analyzes low-confidence BUY/SELL signals
+# (e.g. gemini-3-pro-preview). Unset = no escalation.
+GEMINI_ESCALATION_MODEL = os.getenv("GEMINI_ESCALATION_MODEL") or None
 
 # --- Home Assistant ---
 HA_API_URL = os.getenv("HA_API_URL", "http://192.168.0.207:8123")
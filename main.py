@@ -13,6 +13,7 @@ from apscheduler.schedulers.blocking import BlockingScheduler
 from src.strategy_engine import StrategyEngine
 from src.news_fetcher import NewsFetcher
 from src.database import (
+    close_db,
     fetch_trade_data,
     save_post_mortem,
     fetch_recent_trades,
@@ -624,17 +625,27 @@ def run_post_mortem(deal_id: str, model_name: str = "gemini-3-flash-preview"):
         logger.warning(f"Failed to fetch historical price context for post-mortem: {e}")
 
     # 3. Analyze with Gemini
-    analyst = GeminiAnalyst(model_name=model_name)
-    report = analyst.generate_post_mortem(trade_data, price_history_df=price_history_df)
-
-    # 4. Save and Print
-    save_post_mortem(deal_id, report)
+    # 4. Print as it streams in, then save
+    # Re-running a post-mortem on unchanged data replays the saved response
+    analyst = GeminiAnalyst(model_name=model_name, use_cache=True)
 
     print("\n" + "=" * 40)
     print(f"POST-MORTEM ANALYSIS: {deal_id}")
     print("=" * 40)
-    print(report)
-    print("=" * 40 + "\n")
+    chunks = []
+    for chunk in analyst.stream_post_mortem(
+        trade_data, price_history_df=price_history_df
+    ):
+        print(chunk, end="", flush=True)
+        chunks.append(chunk)
+    print("\n" + "=" * 40 + "\n")
+
+    # A failed or interrupted report must not replace a saved one; a truncated
+    # one is still kept, with its [TRUNCATED] marker
+    if analyst.last_post_mortem_complete or analyst.last_post_mortem_truncated:
+        save_post_mortem(deal_id, "".join(chunks))
+    else:
+        logger.warning(f"Post-mortem for {deal_id} did not complete; not saving it.")
 
 
 def run_delete_trade(identifier: str):
@@ -1629,6 +1640,8 @@ def main():
         scheduler.start()
     except (KeyboardInterrupt, SystemExit):
         pass
+    finally:
+        close_db()
 
 
 if __name__ == "__main__":
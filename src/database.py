@@ -1,7 +1,9 @@
 import sqlite3
 import logging
 import os
+import threading
 from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence
 
 logger = logging.getLogger(__name__)
 
@@ -9,181 +11,369 @@ logger = logging.getLogger(__name__)
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DB_PATH = str(PROJECT_ROOT / "data" / "trader.db")
 
+# Shared connections, one per database file, kept open for the process lifetime.
+# Writers hold DB_LOCK so transactions from different threads don't interleave.
+_CONNECTIONS: Dict[str, sqlite3.Connection] = {}
+# Read-only handles for query-only helpers; under WAL they never block the writer.
+_READ_ONLY_CONNECTIONS: Dict[str, sqlite3.Connection] = {}
+DB_LOCK = threading.RLock()
+
+STATEMENT_CACHE_SIZE = 128
+
+# Bump when init_db gains new tables, columns or indexes.
+SCHEMA_VERSION = 2
+
+TRADE_LOG_COLUMNS = (
+    "id",
+    "timestamp",
+    "epic",
+    "action",
+    "entry_type",
+    "entry",
+    "stop_loss",
+    "take_profit",
+    "size",
+    "outcome",
+    "reasoning",
+    "confidence",
+    "spread_at_entry",
+    "atr",
+    "is_dry_run",
+    "deal_id",
+    "exit_price",
+    "pnl",
+    "exit_time",
+    "post_mortem",
+    "use_trailing_stop",
+    "initial_stop_loss",
+)
+
+# Columns needed to list trades; leaves out the large post_mortem text
+TRADE_SUMMARY_COLUMNS = (
+    "id",
+    "timestamp",
+    "epic",
+    "action",
+    "entry_type",
+    "entry",
+    "stop_loss",
+    "take_profit",
+    "outcome",
+    "reasoning",
+    "deal_id",
+    "exit_price",
+    "pnl",
+    "exit_time",
+    "use_trailing_stop",
+)
+
+
+def _ensure_dirs(path):
+    """
+    Creates the parent directory of the database file if it doesn't exist yet.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
 
 def get_db_connection(db_path=None):
     """
-    Establishes and returns a connection to the SQLite database.
+    Returns the shared connection to the SQLite database, creating it on first use.
+    Callers must not close the returned connection; use close_db() on shutdown.
     """
     path = db_path if db_path else DB_PATH
-    # Ensure the data directory exists
-    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = _CONNECTIONS.get(path)
+    if conn is not None:
+        return conn
 
-    try:
-        conn = sqlite3.connect(path)
-        conn.row_factory = sqlite3.Row  # Return rows as dictionary-like objects
+    with DB_LOCK:
+        conn = _CONNECTIONS.get(path)
+        if conn is not None:
+            return conn
+
+        # Only needed once, when the shared connection is first opened
+        _ensure_dirs(path)
+
+        try:
+            # Keep compiled statements around across calls on the shared connection
+            conn = sqlite3.connect(
+                path, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE
+            )
+            conn.row_factory = sqlite3.Row  # Return rows as dictionary-like objects
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except Exception as e:
+            logger.error(f"Failed to connect to database: {e}")
+            raise
+
+        _CONNECTIONS[path] = conn
         return conn
-    except Exception as e:
-        logger.error(f"Failed to connect to database: {e}")
-        raise
+
+
+def get_read_only_connection(db_path=None):
+    """
+    Returns a shared read-only connection to an existing SQLite database.
+    Like get_db_connection, the connection stays open until close_db().
+    """
+    path = db_path if db_path else DB_PATH
+    conn = _READ_ONLY_CONNECTIONS.get(path)
+    if conn is not None:
+        return conn
+
+    with DB_LOCK:
+        conn = _READ_ONLY_CONNECTIONS.get(path)
+        if conn is not None:
+            return conn
+
+        uri = f"{Path(path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        _READ_ONLY_CONNECTIONS[path] = conn
+        return conn
+
+
+def close_db(db_path=None):
+    """
+    Closes the shared connections for db_path, or every open connection if omitted.
+    """
+    with DB_LOCK:
+        for connections in (_READ_ONLY_CONNECTIONS, _CONNECTIONS):
+            paths = [db_path] if db_path else list(connections)
+            for path in paths:
+                conn = connections.pop(path, None)
+                if conn is not None:
+                    conn.close()
 
 
 def init_db(db_path=None):
     """
     Initializes the database schema.
+    Skips the DDL and migration checks when PRAGMA user_version is current.
     """
     logger.info(f"Initializing database at: {db_path if db_path else DB_PATH}")
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
+    with DB_LOCK:
+        conn = get_db_connection(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] >= SCHEMA_VERSION:
+            logger.info("Database schema is up to date.")
+            return
+
+        # Run the whole schema setup in one transaction; any failure (including
+        # a migration) rolls back and leaves user_version unstamped for a retry
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Updated Table for Trade Logs (Consolidated)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS trade_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT,
+                    epic TEXT,
+                    action TEXT,
+                    entry_type TEXT,
+                    entry REAL,
+                    stop_loss REAL,
+                    take_profit REAL,
+                    size REAL,
+                    outcome TEXT,
+                    reasoning TEXT,
+                    confidence TEXT,
+                    spread_at_entry REAL,
+                    atr REAL,
+                    is_dry_run BOOLEAN,
+                    deal_id TEXT,
+                    exit_price REAL,
+                    pnl REAL,
+                    exit_time TEXT,
+                    post_mortem TEXT,
+                    use_trailing_stop BOOLEAN,
+                    initial_stop_loss REAL
+                )
+            """)
 
-    # Updated Table for Trade Logs (Consolidated)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS trade_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            epic TEXT,
-            action TEXT,
-            entry_type TEXT,
-            entry REAL,
-            stop_loss REAL,
-            take_profit REAL,
-            size REAL,
-            outcome TEXT,
-            reasoning TEXT,
-            confidence TEXT,
-            spread_at_entry REAL,
-            atr REAL,
-            is_dry_run BOOLEAN,
-            deal_id TEXT,
-            exit_price REAL,
-            pnl REAL,
-            exit_time TEXT,
-            post_mortem TEXT,
-            use_trailing_stop BOOLEAN,
-            initial_stop_loss REAL
-        )
-    """)
+            # Check if 'entry_type' column exists (for migration)
+            cursor.execute("PRAGMA table_info(trade_log)")
+            columns = [info[1] for info in cursor.fetchall()]
 
-    # Check if 'entry_type' column exists (for migration)
-    cursor.execute("PRAGMA table_info(trade_log)")
-    columns = [info[1] for info in cursor.fetchall()]
+            if "entry_type" not in columns:
+                logger.info(
+                    "Migrating database: Adding 'entry_type' column to 'trade_log'..."
+                )
+                cursor.execute("ALTER TABLE trade_log ADD COLUMN entry_type TEXT")
+                logger.info("Migration successful.")
 
-    if "entry_type" not in columns:
-        logger.info("Migrating database: Adding 'entry_type' column to 'trade_log'...")
-        try:
-            cursor.execute("ALTER TABLE trade_log ADD COLUMN entry_type TEXT")
-            logger.info("Migration successful.")
-        except Exception as e:
-            logger.error(f"Migration failed: {e}")
+            if "use_trailing_stop" not in columns:
+                logger.info(
+                    "Migrating database: Adding 'use_trailing_stop' column to 'trade_log'..."
+                )
+                cursor.execute(
+                    "ALTER TABLE trade_log ADD COLUMN use_trailing_stop BOOLEAN"
+                )
+                logger.info("Migration successful.")
 
-    if "use_trailing_stop" not in columns:
-        logger.info(
-            "Migrating database: Adding 'use_trailing_stop' column to 'trade_log'..."
-        )
-        try:
-            cursor.execute("ALTER TABLE trade_log ADD COLUMN use_trailing_stop BOOLEAN")
-            logger.info("Migration successful.")
-        except Exception as e:
-            logger.error(f"Migration failed: {e}")
+            if "initial_stop_loss" not in columns:
+                logger.info(
+                    "Migrating database: Adding 'initial_stop_loss' column to 'trade_log'..."
+                )
+                cursor.execute(
+                    "ALTER TABLE trade_log ADD COLUMN initial_stop_loss REAL"
+                )
+                logger.info("Migration successful.")
 
-    if "initial_stop_loss" not in columns:
-        logger.info(
-            "Migrating database: Adding 'initial_stop_loss' column to 'trade_log'..."
-        )
-        try:
-            cursor.execute("ALTER TABLE trade_log ADD COLUMN initial_stop_loss REAL")
-            logger.info("Migration successful.")
-        except Exception as e:
-            logger.error(f"Migration failed: {e}")
-
-    # Market Candles (1-Minute Aggregation)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS market_candles_1m (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            epic TEXT,
-            open REAL,
-            high REAL,
-            low REAL,
-            close REAL,
-            volume INTEGER
-        )
-    """)
-    cursor.execute(
-        "CREATE INDEX IF NOT EXISTS idx_market_candles_1m_epic_timestamp ON market_candles_1m (epic, timestamp)"
-    )
-
-    # Market Data Table (Ticks)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS market_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            epic TEXT,
-            bid REAL,
-            offer REAL,
-            volume INTEGER
-        )
-    """)
-    # Create index for fast time-range queries
-    cursor.execute(
-        "CREATE INDEX IF NOT EXISTS idx_market_data_epic_timestamp ON market_data (epic, timestamp)"
-    )
-
-    conn.commit()
-    conn.close()
+            # Indexes for deal_id lookups and most-recent-first listings
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_trade_log_deal_id ON trade_log (deal_id)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_trade_log_timestamp ON trade_log (timestamp DESC)"
+            )
+
+            # Market Candles (1-Minute Aggregation)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS market_candles_1m (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT,
+                    epic TEXT,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    volume INTEGER
+                )
+            """)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_market_candles_1m_epic_timestamp ON market_candles_1m (epic, timestamp)"
+            )
+
+            # Market Data Table (Ticks)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS market_data (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT,
+                    epic TEXT,
+                    bid REAL,
+                    offer REAL,
+                    volume INTEGER
+                )
+            """)
+            # Create index for fast time-range queries
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_market_data_epic_timestamp ON market_data (epic, timestamp)"
+            )
+
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
     logger.info(f"Database initialized at {db_path if db_path else DB_PATH}")
 
 
-def fetch_trade_data(deal_id: str, db_path=None):
+def _column_list(columns: Sequence[str]) -> str:
+    """
+    Builds a SELECT column list, allowing only known trade_log columns.
+    """
+    unknown = set(columns) - set(TRADE_LOG_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown trade_log columns: {sorted(unknown)}")
+    return ", ".join(columns)
+
+
+def log_trades_bulk(trades: Iterable[dict], db_path=None) -> int:
+    """
+    Inserts many trade_log rows in a single executemany() transaction.
+    Each trade is a dict keyed by trade_log column name; missing keys are stored as NULL.
+    Returns the number of rows inserted.
+    """
+    columns = TRADE_LOG_COLUMNS[1:]  # id is assigned by SQLite
+    placeholders = ", ".join("?" for _ in columns)
+    sql = f"INSERT INTO trade_log ({', '.join(columns)}) VALUES ({placeholders})"
+    rows = [tuple(trade.get(col) for col in columns) for trade in trades]
+    if not rows:
+        return 0
+
+    conn = get_db_connection(db_path)
+    try:
+        with DB_LOCK, conn:
+            conn.executemany(sql, rows)
+        logger.info(f"Bulk inserted {len(rows)} trades into trade_log.")
+        return len(rows)
+    except Exception as e:
+        logger.error(f"Failed to bulk insert trades: {e}")
+        return 0
+
+
+def fetch_trade_data(
+    deal_id: str, db_path=None, columns: Optional[Sequence[str]] = None
+):
     """
-    Fetches complete data for a trade from trade_log by deal_id.
+    Fetches data for a trade from trade_log by deal_id.
     Returns a dictionary with 'log' key containing the row data.
+    All columns are returned unless a subset is requested via columns.
     """
+    select = _column_list(columns or TRADE_LOG_COLUMNS)
     conn = get_db_connection(db_path)
     cursor = conn.cursor()
 
-    try:
-        # Fetch from trade_log
-        cursor.execute("SELECT * FROM trade_log WHERE deal_id = ?", (deal_id,))
-        trade_log = cursor.fetchone()
+    # Fetch from trade_log
+    cursor.execute(f"SELECT {select} FROM trade_log WHERE deal_id = ?", (deal_id,))
+    trade_log = cursor.fetchone()
 
-        if not trade_log:
-            return None
+    if not trade_log:
+        return None
 
-        return {"log": dict(trade_log)}
-    finally:
-        conn.close()
+    return {"log": dict(trade_log)}
 
 
-def update_trade_outcome(
+def finalize_trade(
     deal_id: str,
     exit_price: float,
     pnl: float,
     exit_time: str,
     outcome: str,
+    post_mortem: str = None,
     db_path=None,
 ):
     """
-    Updates an existing trade log with exit details.
+    Records a trade's exit details and (optionally) its post-mortem in a single UPDATE.
+    An omitted post_mortem leaves any existing analysis untouched.
     """
     conn = get_db_connection(db_path)
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            UPDATE trade_log 
-            SET exit_price = ?, pnl = ?, exit_time = ?, outcome = ?
-            WHERE deal_id = ?
-        """,
-            (exit_price, pnl, exit_time, outcome, deal_id),
-        )
-        conn.commit()
+        with DB_LOCK, conn:
+            conn.execute(
+                """
+                UPDATE trade_log
+                SET exit_price = ?, pnl = ?, exit_time = ?, outcome = ?,
+                    post_mortem = COALESCE(?, post_mortem)
+                WHERE deal_id = ?
+            """,
+                (exit_price, pnl, exit_time, outcome, post_mortem, deal_id),
+            )
         logger.info(
             f"Updated trade outcome for {deal_id}: PnL={pnl}, Outcome={outcome}"
         )
     except Exception as e:
         logger.error(f"Failed to update trade outcome: {e}")
-    finally:
-        conn.close()
+
+
+def update_trade_outcome(
+    deal_id: str,
+    exit_price: float,
+    pnl: float,
+    exit_time: str,
+    outcome: str,
+    db_path=None,
+):
+    """
+    Updates an existing trade log with exit details.
+    """
+    finalize_trade(deal_id, exit_price, pnl, exit_time, outcome, db_path=db_path)
 
 
 def save_post_mortem(deal_id: str, analysis: str, db_path=None):
@@ -191,37 +381,37 @@ def save_post_mortem(deal_id: str, analysis: str, db_path=None):
     Saves the post-mortem analysis to the trade_log table.
     """
     conn = get_db_connection(db_path)
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "UPDATE trade_log SET post_mortem = ? WHERE deal_id = ?",
-            (analysis, deal_id),
-        )
-        conn.commit()
+        with DB_LOCK, conn:
+            conn.execute(
+                "UPDATE trade_log SET post_mortem = ? WHERE deal_id = ?",
+                (analysis, deal_id),
+            )
         logger.info(f"Saved post-mortem for deal {deal_id}")
     except Exception as e:
         logger.error(f"Failed to save post-mortem: {e}")
-    finally:
-        conn.close()
 
 
-def fetch_recent_trades(limit: int = 5, db_path=None):
+def fetch_recent_trades(
+    limit: int = 5,
+    db_path=None,
+    columns: Sequence[str] = TRADE_SUMMARY_COLUMNS,
+):
     """
     Fetches the N most recent trades from the trade_log.
+    Only the summary columns are returned by default.
     """
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
+    select = _column_list(columns)
     try:
+        cursor = get_read_only_connection(db_path).cursor()
         cursor.execute(
-            "SELECT * FROM trade_log ORDER BY timestamp DESC LIMIT ?", (limit,)
+            f"SELECT {select} FROM trade_log ORDER BY timestamp DESC LIMIT ?", (limit,)
         )
-        recent_trades = cursor.fetchall()
-        return [dict(row) for row in recent_trades]
+        # Column names are already known, so skip fetchall() and Row key lookups
+        return [dict(zip(columns, row)) for row in cursor]
     except Exception as e:
         logger.error(f"Failed to fetch recent trades: {e}")
         return []
-    finally:
-        conn.close()
 
 
 def fetch_last_n_closed_trades(limit: int = 3, db_path=None):
@@ -245,8 +435,6 @@ def fetch_last_n_closed_trades(limit: int = 3, db_path=None):
     except Exception as e:
         logger.error(f"Failed to fetch last {limit} closed trades: {e}")
         return []
-    finally:
-        conn.close()
 
 
 def fetch_all_trade_logs(db_path=None):
@@ -263,8 +451,6 @@ def fetch_all_trade_logs(db_path=None):
     except Exception as e:
         logger.error(f"Failed to fetch all trade logs: {e}")
         return []
-    finally:
-        conn.close()
 
 
 def fetch_trades_in_range(start_date: str, end_date: str, db_path=None):
@@ -284,8 +470,6 @@ def fetch_trades_in_range(start_date: str, end_date: str, db_path=None):
     except Exception as e:
         logger.error(f"Failed to fetch trades in range: {e}")
         return []
-    finally:
-        conn.close()
 
 
 def fetch_active_trades(db_path=None):
@@ -305,8 +489,6 @@ def fetch_active_trades(db_path=None):
     except Exception as e:
         logger.error(f"Failed to fetch active trades: {e}")
         return []
-    finally:
-        conn.close()
 
 
 def update_trade_stop_loss(deal_id: str, new_stop_loss: float, db_path=None):
@@ -315,18 +497,15 @@ def update_trade_stop_loss(deal_id: str, new_stop_loss: float, db_path=None):
     Does NOT affect initial_stop_loss.
     """
     conn = get_db_connection(db_path)
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "UPDATE trade_log SET stop_loss = ? WHERE deal_id = ?",
-            (new_stop_loss, deal_id),
-        )
-        conn.commit()
+        with DB_LOCK, conn:
+            conn.execute(
+                "UPDATE trade_log SET stop_loss = ? WHERE deal_id = ?",
+                (new_stop_loss, deal_id),
+            )
         logger.info(f"Updated DB stop_loss for {deal_id} to {new_stop_loss}")
     except Exception as e:
         logger.error(f"Failed to update stop_loss in DB: {e}")
-    finally:
-        conn.close()
 
 
 def sync_active_trade(
@@ -345,63 +524,63 @@ def sync_active_trade(
     If not, inserts a new record representing this active trade.
     """
     conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    try:
-        # Check if exists
-        cursor.execute("SELECT id FROM trade_log WHERE deal_id = ?", (deal_id,))
-        row = cursor.fetchone()
-
-        if row:
-            # Update existing
-            cursor.execute(
-                """
-                UPDATE trade_log
-                SET size = ?, entry = ?, stop_loss = ?, take_profit = ?, outcome = 'LIVE_PLACED'
-                WHERE deal_id = ?
-                """,
-                (size, entry, stop_loss, take_profit, deal_id),
-            )
-            logger.info(f"Updated existing DB record for Deal {deal_id}")
-        else:
-            # Insert new
-            from datetime import datetime
-
-            timestamp = datetime.now().isoformat()
-            cursor.execute(
-                """
-                INSERT INTO trade_log (
-                    timestamp, epic, action, entry_type, entry, stop_loss, initial_stop_loss, take_profit,
-                    size, outcome, reasoning, confidence, spread_at_entry,
-                    atr, is_dry_run, deal_id, use_trailing_stop
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    timestamp,
-                    epic,
-                    direction,  # 'BUY' or 'SELL'
-                    "MANUAL_MONITOR",
-                    entry,
-                    stop_loss,
-                    stop_loss,  # Set initial_stop_loss same as current for manual resume
-                    take_profit,
-                    size,
-                    "LIVE_PLACED",
-                    "Resumed/Manual Monitor",
-                    "N/A",
-                    0.0,
-                    0.0,  # ATR unknown at this point
-                    False,  # Not dry run if we have a deal ID
-                    deal_id,
-                    True,  # Default to True for monitored trades
-                ),
-            )
-            logger.info(f"Inserted new DB record for Deal {deal_id}")
+    with DB_LOCK:
+        cursor = conn.cursor()
+        try:
+            # Check if exists
+            cursor.execute("SELECT id FROM trade_log WHERE deal_id = ?", (deal_id,))
+            row = cursor.fetchone()
+
+            if row:
+                # Update existing
+                cursor.execute(
+                    """
+                    UPDATE trade_log
+                    SET size = ?, entry = ?, stop_loss = ?, take_profit = ?, outcome = 'LIVE_PLACED'
+                    WHERE deal_id = ?
+                    """,
+                    (size, entry, stop_loss, take_profit, deal_id),
+                )
+                logger.info(f"Updated existing DB record for Deal {deal_id}")
+            else:
+                # Insert new
+                from datetime import datetime
+
+                timestamp = datetime.now().isoformat()
+                cursor.execute(
+                    """
+                    INSERT INTO trade_log (
+                        timestamp, epic, action, entry_type, entry, stop_loss, initial_stop_loss, take_profit,
+                        size, outcome, reasoning, confidence, spread_at_entry,
+                        atr, is_dry_run, deal_id, use_trailing_stop
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        timestamp,
+                        epic,
+                        direction,  # 'BUY' or 'SELL'
+                        "MANUAL_MONITOR",
+                        entry,
+                        stop_loss,
+                        stop_loss,  # Set initial_stop_loss same as current for manual resume
+                        take_profit,
+                        size,
+                        "LIVE_PLACED",
+                        "Resumed/Manual Monitor",
+                        "N/A",
+                        0.0,
+                        0.0,  # ATR unknown at this point
+                        False,  # Not dry run if we have a deal ID
+                        deal_id,
+                        True,  # Default to True for monitored trades
+                    ),
+                )
+                logger.info(f"Inserted new DB record for Deal {deal_id}")
 
-        conn.commit()
-    except Exception as e:
-        logger.error(f"Failed to sync trade to DB: {e}")
-    finally:
-        conn.close()
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to sync trade to DB: {e}")
 
 
 def save_candle(
@@ -418,20 +597,17 @@ def save_candle(
     Logs a 1-minute candle to the database.
     """
     conn = get_db_connection(db_path)
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            INSERT OR IGNORE INTO market_candles_1m (timestamp, epic, open, high, low, close, volume) 
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (timestamp, epic, open_price, high, low, close, volume),
-        )
-        conn.commit()
+        with DB_LOCK, conn:
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO market_candles_1m (timestamp, epic, open, high, low, close, volume)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (timestamp, epic, open_price, high, low, close, volume),
+            )
     except Exception as e:
         logger.error(f"Failed to save candle: {e}")
-    finally:
-        conn.close()
 
 
 def save_candles_batch(epic: str, df, db_path=None):
@@ -443,43 +619,43 @@ def save_candles_batch(epic: str, df, db_path=None):
         return
 
     conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    try:
-        # Prepare data for insertion
-        # Assuming df index is timestamp and columns are ['open', 'high', 'low', 'close', 'volume']
-        data = []
-        for ts, row in df.iterrows():
-            # Convert timestamp to ISO string if it is a datetime object
-            ts_str = ts.isoformat() if hasattr(ts, "isoformat") else str(ts)
-
-            # Handle missing volume
-            vol = int(row["volume"]) if "volume" in row else 0
-
-            data.append(
-                (
-                    ts_str,
-                    epic,
-                    float(row["open"]),
-                    float(row["high"]),
-                    float(row["low"]),
-                    float(row["close"]),
-                    vol,
+    with DB_LOCK:
+        cursor = conn.cursor()
+        try:
+            # Prepare data for insertion
+            # Assuming df index is timestamp and columns are ['open', 'high', 'low', 'close', 'volume']
+            data = []
+            for ts, row in df.iterrows():
+                # Convert timestamp to ISO string if it is a datetime object
+                ts_str = ts.isoformat() if hasattr(ts, "isoformat") else str(ts)
+
+                # Handle missing volume
+                vol = int(row["volume"]) if "volume" in row else 0
+
+                data.append(
+                    (
+                        ts_str,
+                        epic,
+                        float(row["open"]),
+                        float(row["high"]),
+                        float(row["low"]),
+                        float(row["close"]),
+                        vol,
+                    )
                 )
-            )
 
-        cursor.executemany(
-            """
-            INSERT OR IGNORE INTO market_candles_1m (timestamp, epic, open, high, low, close, volume)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            data,
-        )
-        conn.commit()
-        logger.info(f"Saved {len(data)} candles for {epic} to database.")
-    except Exception as e:
-        logger.error(f"Failed to save candles batch: {e}")
-    finally:
-        conn.close()
+            cursor.executemany(
+                """
+                INSERT OR IGNORE INTO market_candles_1m (timestamp, epic, open, high, low, close, volume)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                data,
+            )
+            conn.commit()
+            logger.info(f"Saved {len(data)} candles for {epic} to database.")
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to save candles batch: {e}")
 
 
 def save_market_tick(
@@ -500,17 +676,14 @@ def save_market_tick(
         timestamp = datetime.now().isoformat()
 
     conn = get_db_connection(db_path)
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "INSERT INTO market_data (timestamp, epic, bid, offer, volume) VALUES (?, ?, ?, ?, ?)",
-            (timestamp, epic, bid, offer, volume),
-        )
-        conn.commit()
+        with DB_LOCK, conn:
+            conn.execute(
+                "INSERT INTO market_data (timestamp, epic, bid, offer, volume) VALUES (?, ?, ?, ?, ?)",
+                (timestamp, epic, bid, offer, volume),
+            )
     except Exception as e:
         logger.error(f"Failed to save market tick: {e}")
-    finally:
-        conn.close()
 
 
 def fetch_market_data_range(epic: str, start_time: str, end_time: str, db_path=None):
@@ -533,8 +706,6 @@ def fetch_market_data_range(epic: str, start_time: str, end_time: str, db_path=N
     except Exception as e:
         logger.error(f"Failed to fetch market data range: {e}")
         return []
-    finally:
-        conn.close()
 
 
 def fetch_candles_range(epic: str, start_time: str, end_time: str, db_path=None):
@@ -559,8 +730,6 @@ def fetch_candles_range(epic: str, start_time: str, end_time: str, db_path=None)
     except Exception as e:
         logger.error(f"Failed to fetch candles range: {e}")
         return []
-    finally:
-        conn.close()
 
 
 def delete_trade_log(identifier: str, is_db_id: bool = False, db_path=None):
@@ -568,26 +737,31 @@ def delete_trade_log(identifier: str, is_db_id: bool = False, db_path=None):
     Deletes a trade log entry by deal_id or primary key id.
     """
     conn = get_db_connection(db_path)
-    cursor = conn.cursor()
     try:
-        if is_db_id:
-            cursor.execute("DELETE FROM trade_log WHERE id = ?", (identifier,))
-            logger.info(f"Deleted trade log with DB ID: {identifier}")
-        else:
-            cursor.execute("DELETE FROM trade_log WHERE deal_id = ?", (identifier,))
-            logger.info(f"Deleted trade log with Deal ID: {identifier}")
-
-        if cursor.rowcount == 0:
-            logger.warning(f"No trade found to delete for identifier: {identifier}")
-            return False
-
-        conn.commit()
-        return True
+        # The connection context ends the transaction on every path, so the
+        # shared connection is never left holding the write lock
+        with DB_LOCK, conn:
+            if is_db_id:
+                cursor = conn.execute(
+                    "DELETE FROM trade_log WHERE id = ?", (identifier,)
+                )
+            else:
+                cursor = conn.execute(
+                    "DELETE FROM trade_log WHERE deal_id = ?", (identifier,)
+                )
+            deleted = cursor.rowcount
     except Exception as e:
         logger.error(f"Failed to delete trade log: {e}")
         return False
-    finally:
-        conn.close()
+
+    if deleted == 0:
+        logger.warning(f"No trade found to delete for identifier: {identifier}")
+        return False
+    if is_db_id:
+        logger.info(f"Deleted trade log with DB ID: {identifier}")
+    else:
+        logger.info(f"Deleted trade log with Deal ID: {identifier}")
+    return True
 
 
 if __name__ == "__main__":
@@ -1,22 +1,201 @@
-import json
+import asyncio
+import concurrent.futures
+import hashlib
+import itertools
+import math
 import logging
-import pandas as pd
+import os
+import textwrap
+import threading
+import time
+import httpx
 import typing_extensions as typing
 from enum import Enum
 from google import genai
 from google.genai import errors, types
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 from tenacity import (
     retry,
+    retry_if_exception,
     stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
+    wait_random_exponential,
 )
 
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, GEMINI_ESCALATION_MODEL
+
+if typing.TYPE_CHECKING:
+    # pandas is only needed when a post-mortem includes price history
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# Lifetime of the Gemini context cache holding the analysis system instruction
+CONTEXT_CACHE_TTL_SECONDS = 3600
+# Smallest prompt Gemini accepts for an explicit context cache; shorter
+# instructions are sent inline and rely on implicit prefix caching instead
+CONTEXT_CACHE_MIN_TOKENS = 1024
+CONTEXT_CACHE_MIN_TOKENS_PRO = 4096
+# How long a failed context cache creation is remembered before retrying
+CONTEXT_CACHE_RETRY_SECONDS = 60
+# Longest an analyst waits on another's in-flight context cache creation
+CONTEXT_CACHE_WAIT_SECONDS = 30
+
+# Default lifetime of on-disk response cache entries (see GeminiAnalyst use_cache)
+RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+# One client per API key so every analyst shares its pooled HTTP connections
+_CLIENTS: typing.Dict[typing.Optional[str], genai.Client] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+# Keep idle connections (and their TLS sessions) open across the minutes
+# between analyses; httpx's default keep-alive expiry is only 5 seconds
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, keepalive_expiry=300)
+_HTTP_OPTIONS = types.HttpOptions(
+    client_args={"limits": _HTTP_LIMITS},
+    async_client_args={"limits": _HTTP_LIMITS},
+)
+
+
+def get_gemini_client(api_key: typing.Optional[str] = GEMINI_API_KEY) -> genai.Client:
+    """
+    Returns the shared Gemini client for an API key, creating it on first use.
+    """
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(api_key)
+        if client is None:
+            client = genai.Client(api_key=api_key, http_options=_HTTP_OPTIONS)
+            _CLIENTS[api_key] = client
+        return client
+
+
+# Context caches shared by every analyst using the same model and instruction,
+# keyed by (model_name, instruction hash) -> (future, refresh deadline). The
+# first analyst to miss creates the cache outside the lock while the others
+# wait on its future, which resolves to the cache name (None if the
+# instruction is too small to cache) or the creation error. Errors stay
+# recorded until the deadline so other analysts don't retry straight away.
+_CONTEXT_CACHES: typing.Dict[
+    typing.Tuple[str, str], typing.Tuple[concurrent.futures.Future, float]
+] = {}
+_CONTEXT_CACHES_LOCK = threading.Lock()
+
+
+def _context_cache_min_tokens(model_name: str) -> int:
+    """Minimum explicit context cache size for a model."""
+    return (
+        CONTEXT_CACHE_MIN_TOKENS_PRO
+        if "pro" in model_name
+        else CONTEXT_CACHE_MIN_TOKENS
+    )
+
+
+def _is_cache_too_small_error(exc: BaseException) -> bool:
+    """True for the 400 Gemini returns when a cache is below the minimum size."""
+    return (
+        isinstance(exc, errors.ClientError)
+        and exc.code == 400
+        and exc.status == "INVALID_ARGUMENT"
+    )
+
+
+def _forget_context_cache(key: typing.Tuple[str, str], name: str):
+    """Drops a registry entry if it still resolves to the named cache."""
+    with _CONTEXT_CACHES_LOCK:
+        entry = _CONTEXT_CACHES.get(key)
+        if entry is None or not entry[0].done() or entry[0].exception() is not None:
+            return
+        if entry[0].result() == name:
+            del _CONTEXT_CACHES[key]
+
+
+# Post-mortem prompt sizing: below these lengths the data is sent as-is
+MONITOR_SAMPLE_FULL_MAX = 10
+RESAMPLE_MIN_ROWS = 20
+# Monitor row fields worth sending to the model, in output order
+MONITOR_PROMPT_FIELDS = ("timestamp", "bid", "offer", "pnl")
+
+
+def _format_monitor_rows(rows: typing.Sequence[dict]) -> str:
+    """
+    Formats monitor rows as compact "key=value" lines instead of dict reprs.
+    """
+    return "\n".join(
+        ",".join(
+            f"{field}={row[field]}" for field in MONITOR_PROMPT_FIELDS if field in row
+        )
+        for row in rows
+    )
+
+
+ANALYSIS_PROMPT_HEADER = "Analyze the following {strategy_name} market data and generate a trading signal:\n\n"
+
+
+def _analysis_prompt(market_data_context: str, strategy_name: str) -> str:
+    """
+    Builds the analysis prompt: a short per-strategy header followed by the market data.
+    """
+    return (
+        ANALYSIS_PROMPT_HEADER.format(strategy_name=strategy_name) + market_data_context
+    )
+
+
+ANALYST_SYSTEM_INSTRUCTION = textwrap.dedent(
+    """
+    You are a Senior Momentum Trader specializing in "Open Drive" breakout strategies for global indices.
+    Your objective is to identify high-probability breakout setups during the market open (first 90 mins).
+
+    ### 1. Market Analysis Protocol
+    Analyze the provided Market Context (OHLC, Indicators, Session Data) and News to determine the Market Regime:
+    - **High Volatility (ATR > Avg):** Favor **BREAKOUTS** (Trend Following). Look for strong momentum pushing through Key Levels.
+    - **Low Volatility (ATR < Avg):** Favor **MEAN REVERSION** (Fade Extremes) or **WAIT**. Breakouts often fail here ("Fake-outs").
+    - **Coiling:** If price is consolidating (narrowing range), anticipate an imminent volatility expansion (Breakout).
+    - **Granular Structure (5m Data):** Use the provided 5-minute candles to identify micro-structure, specifically checking for "Wick Rejections" or "V-Shape Reversals" that the 15-minute chart might hide. Ensure your entry isn't into a recent micro-rejection.
+    - **Precision Timing (1m Data):** Use the 1-minute candles for ultimate entry pinpointing. Identify if the price is currently stalling, rejecting, or accelerating at your proposed entry level. 1-minute wicks are the most reliable indicators of immediate liquidity sweeps.
+
+    ### 2. Trading Rules (Strict)
+    - **Direction:** Trade WITH the momentum (Open > EMA20 = Bullish bias, unless overextended).
+    - **Extension Rule (No Chasing):** Do NOT recommend a trade if the entry price is more than **1.5x ATR** away from the 20-period EMA. Wait for a pullback or return 'WAIT'.
+    - **Entry:** MUST be a specific price level where the "Wave" begins (e.g., break of Pre-Market High/Low).
+    - **Stop Loss (Risk):**
+        - **HARD RULE:** The Stop Loss MUST be at least **1.5x ATR** away from the entry price, regardless of nearby technical levels.
+        - **Structural Placement:** Place beyond Swing High/Low or Key Moving Averages, BUT ensure the distance meets the 1.5x ATR minimum. If the structural level is too close (e.g., 10 points away when ATR is 15), you MUST add padding to reach >1.5x ATR.
+        - **High Volatility Regime:** When ATR > Average, increase minimum distance to **2.0x ATR** to survive "stop runs".
+        - **Pre-Open/Opening Flush:** Do NOT place stops exactly at the High/Low of the pre-market session. Add a buffer (0.5x ATR) *beyond* the Wick to avoid liquidity sweeps.
+        - **MAXIMUM DISTANCE:** 5.0x ATR (If structural stop requires >5x ATR, return 'WAIT').
+    - **Take Profit / Management:**
+        - **Trend Days:** Use `use_trailing_stop=True` for uncapped upside.
+        - **Range Days:** Use `use_trailing_stop=False` and target a fixed Resistance/Support level (R:R > 1.5).
+    - **Plan Validity (Time):**
+        - **BUY/SELL:** Set `validity_time_minutes` to 15-30 mins for fast breakout setups. If the breakout doesn't happen quickly, the setup is invalid. Use 60 mins only for major structural levels.
+        - **WAIT:** The system will automatically re-evaluate in 5 minutes. You do not need to specify a duration for WAIT.
+
+    ### 3. Contrarian Checks
+    - **Retail Sentiment:** If >70% Long, be cautious of Longs (Crowded Trade). If >70% Short, look for Short Squeezes.
+    - **News:** High-Impact Negative News overrides Bullish Technicals (and vice versa).
+
+    ### 4. Output Format
+    - Think deeply about the setup using your internal monologue.
+    - Output the final decision ONLY as a structured JSON object matching the requested schema.
+    - If the setup is unclear, weak, or violates rules, return `action: "WAIT"`.
+    """
+).strip()
+
+
+POST_MORTEM_INSTRUCTIONS = """
+You are a senior trading risk manager conducting a post-mortem analysis.
+
+You will be given the trade log, execution stats, market context and a sample of the monitoring data for a completed trade.
+
+**Analysis Required:**
+1. Did the trade follow the plan?
+2. Was the stop loss too tight given the price action?
+3. Did slippage or spread impact the result significantly?
+4. Was the original reasoning sound based on the outcome?
+5. What is the key lesson for next time?
+
+Provide a concise, bulleted report.
+"""
+
 
 class EmptyGeminiResponseError(Exception):
     """Raised when Gemini returns a response with no text content."""
@@ -24,6 +203,52 @@ class EmptyGeminiResponseError(Exception):
     pass
 
 
+class ContextCacheExpiredError(Exception):
+    """Raised when the context cache referenced by a request no longer exists."""
+
+    pass
+
+
+# ClientError is an APIError subclass but is handled as non-retriable before these
+RETRIABLE_GEMINI_ERRORS = (
+    errors.ServerError,
+    errors.APIError,
+    EmptyGeminiResponseError,
+    ContextCacheExpiredError,
+)
+
+# Finish reasons where the model deterministically refused; retrying won't help
+BLOCKED_FINISH_REASONS = frozenset(
+    {
+        types.FinishReason.SAFETY,
+        types.FinishReason.RECITATION,
+        types.FinishReason.BLOCKLIST,
+        types.FinishReason.PROHIBITED_CONTENT,
+        types.FinishReason.SPII,
+    }
+)
+
+# Client errors that are throttling/timeouts rather than bad requests
+TRANSIENT_CLIENT_ERROR_CODES = frozenset({408, 429})
+
+
+def _is_transient_gemini_error(exc: BaseException) -> bool:
+    """True for errors worth retrying: 5xx, rate limits, timeouts and empty responses."""
+    if isinstance(exc, errors.ClientError):
+        return exc.code in TRANSIENT_CLIENT_ERROR_CODES
+    return isinstance(exc, RETRIABLE_GEMINI_ERRORS)
+
+
+# Shared retry policy for Gemini calls: try once, then retry once with jittered
+# backoff so concurrent analysts don't retry a throttled API in lockstep
+gemini_retry = retry(
+    stop=stop_after_attempt(2),
+    wait=wait_random_exponential(multiplier=1, min=2, max=10),
+    retry=retry_if_exception(_is_transient_gemini_error),
+    reraise=True,  # Let the final exception bubble up to the caller
+)
+
+
 class Action(str, Enum):
     BUY = "BUY"
     SELL = "SELL"
@@ -56,7 +281,8 @@ class TradingSignal(BaseModel):
     entry: float = Field(description="The suggested entry price level.")
 
     entry_type: EntryType = Field(
-        description="The type of entry: 'INSTANT' (execute immediately when price touches level). All trades now use INSTANT entry for maximum wave capture."
+        default=EntryType.INSTANT,
+        description="The type of entry: 'INSTANT' (execute immediately when price touches level). All trades now use INSTANT entry for maximum wave capture.",
     )
 
     stop_loss: float = Field(description="The stop loss price level.")
@@ -72,7 +298,8 @@ class TradingSignal(BaseModel):
     )
 
     use_trailing_stop: bool = Field(
-        description="Whether to use a dynamic trailing stop (True) or a fixed take profit (False). Set to True for breakout/trend strategies to maximize runs. Set to False for range/mean-reversion strategies where price is expected to reverse at target."
+        default=True,
+        description="Whether to use a dynamic trailing stop (True) or a fixed take profit (False). Set to True for breakout/trend strategies to maximize runs. Set to False for range/mean-reversion strategies where price is expected to reverse at target.",
     )
 
     validity_time_minutes: int = Field(
@@ -90,125 +317,629 @@ class TradingSignal(BaseModel):
 
 
 class GeminiAnalyst:
-    def __init__(self, model_name: str = "gemini-3-flash-preview"):
+    # Response schemas are static, so generate them once rather than per request
+    _TRADING_SCHEMA = TradingSignal.model_json_schema()
+    _NEWS_SCHEMA = NewsQuality.model_json_schema()
+    _SIGNAL_LIST_ADAPTER = TypeAdapter(typing.List[TradingSignal])
+    _BATCH_TRADING_SCHEMA = _SIGNAL_LIST_ADAPTER.json_schema()
+
+    _THINKING_CONFIG = types.ThinkingConfig(
+        include_thoughts=True,
+        thinking_level="HIGH",
+    )
+    # Post-mortems discuss losses/stops, which can trip the default filters
+    _POST_MORTEM_SAFETY_SETTINGS = [
+        types.SafetySetting(category=category, threshold="BLOCK_NONE")
+        for category in (
+            "HARM_CATEGORY_HARASSMENT",
+            "HARM_CATEGORY_HATE_SPEECH",
+            "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+            "HARM_CATEGORY_DANGEROUS_CONTENT",
+        )
+    ]
+
+    # Kept byte-stable so the context cache / implicit prefix cache keeps hitting
+    system_instruction = ANALYST_SYSTEM_INSTRUCTION
+
+    def __init__(
+        self,
+        model_name: str = "gemini-3-flash-preview",
+        use_cache: bool = False,
+        cache_ttl: int = RESPONSE_CACHE_TTL_SECONDS,
+        escalation_model: typing.Optional[str] = GEMINI_ESCALATION_MODEL,
+    ):
         """
         Initializes the Gemini Analyst with a Vertex AI model, using the google-genai SDK.
+        With use_cache, responses to identical requests are replayed from disk
+        (intended for dry runs and re-runs, never live trading).
+        With escalation_model, low-confidence BUY/SELL signals are re-analyzed
+        once by that (stronger) model.
         """
 
         self.model_name = model_name
+        self.escalation_model = (
+            escalation_model if escalation_model != model_name else None
+        )
+        self.escalation_count = 0
+        self.last_post_mortem_complete = False
+        self.last_post_mortem_truncated = False
+        self._escalation_analyst = None
+        self.use_cache = use_cache
+        self.cache_ttl = cache_ttl
+        self.cache_dir = os.path.join(".cache", "gemini")
+
+        if self.use_cache:
+            logger.info(f"Gemini response caching enabled. TTL: {self.cache_ttl}s")
+
+        # Shared across analysts so connections are reused between calls
+        self.client = get_gemini_client()
+
+        # Request configs are identical on every call, so build them once
+        self._analyze_config = types.GenerateContentConfig(
+            system_instruction=self.system_instruction,
+            response_mime_type="application/json",
+            response_schema=self._TRADING_SCHEMA,
+            thinking_config=self._THINKING_CONFIG,
+        )
+        self._news_config = types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=self._NEWS_SCHEMA,
+            thinking_config=self._THINKING_CONFIG,
+        )
+        self._post_mortem_config = types.GenerateContentConfig(
+            system_instruction=POST_MORTEM_INSTRUCTIONS,
+            temperature=0.2,
+            max_output_tokens=8192,
+            safety_settings=self._POST_MORTEM_SAFETY_SETTINGS,
+            thinking_config=self._THINKING_CONFIG,
+        )
+
+        # Context cache for the system instruction, shared across instances
+        self._context_cache_key = (
+            self.model_name,
+            hashlib.blake2b(
+                self.system_instruction.encode(), digest_size=16
+            ).hexdigest(),
+        )
+        self._cached_analyze_config = None
+        self._context_cache_unavailable = False
+
+    def _get_response_cache_key(self, kind: str, instruction: str, prompt: str) -> str:
+        """Hashes everything that determines a response: model, request kind, instruction and prompt."""
+        raw_key = f"{self.model_name}|{kind}|{instruction}|{prompt}"
+        return hashlib.blake2b(raw_key.encode(), digest_size=16).hexdigest()
+
+    def _load_cached_response(self, key: str) -> typing.Optional[str]:
+        if not self.use_cache:
+            return None
 
-        # Initialize the client directly
-        self.client = genai.Client(api_key=GEMINI_API_KEY)
-
-        self.system_instruction = """
-            You are a Senior Momentum Trader specializing in "Open Drive" breakout strategies for global indices.
-            Your objective is to identify high-probability breakout setups during the market open (first 90 mins).
-
-            ### 1. Market Analysis Protocol
-            Analyze the provided Market Context (OHLC, Indicators, Session Data) and News to determine the Market Regime:
-            - **High Volatility (ATR > Avg):** Favor **BREAKOUTS** (Trend Following). Look for strong momentum pushing through Key Levels.
-            - **Low Volatility (ATR < Avg):** Favor **MEAN REVERSION** (Fade Extremes) or **WAIT**. Breakouts often fail here ("Fake-outs").
-            - **Coiling:** If price is consolidating (narrowing range), anticipate an imminent volatility expansion (Breakout).
-            - **Granular Structure (5m Data):** Use the provided 5-minute candles to identify micro-structure, specifically checking for "Wick Rejections" or "V-Shape Reversals" that the 15-minute chart might hide. Ensure your entry isn't into a recent micro-rejection.
-            - **Precision Timing (1m Data):** Use the 1-minute candles for ultimate entry pinpointing. Identify if the price is currently stalling, rejecting, or accelerating at your proposed entry level. 1-minute wicks are the most reliable indicators of immediate liquidity sweeps.
-
-            ### 2. Trading Rules (Strict)
-            - **Direction:** Trade WITH the momentum (Open > EMA20 = Bullish bias, unless overextended).
-            - **Extension Rule (No Chasing):** Do NOT recommend a trade if the entry price is more than **1.5x ATR** away from the 20-period EMA. Wait for a pullback or return 'WAIT'.
-            - **Entry:** MUST be a specific price level where the "Wave" begins (e.g., break of Pre-Market High/Low).
-            - **Stop Loss (Risk):**
-                - **HARD RULE:** The Stop Loss MUST be at least **1.5x ATR** away from the entry price, regardless of nearby technical levels.
-                - **Structural Placement:** Place beyond Swing High/Low or Key Moving Averages, BUT ensure the distance meets the 1.5x ATR minimum. If the structural level is too close (e.g., 10 points away when ATR is 15), you MUST add padding to reach >1.5x ATR.
-                - **High Volatility Regime:** When ATR > Average, increase minimum distance to **2.0x ATR** to survive "stop runs".
-                - **Pre-Open/Opening Flush:** Do NOT place stops exactly at the High/Low of the pre-market session. Add a buffer (0.5x ATR) *beyond* the Wick to avoid liquidity sweeps.
-                - **MAXIMUM DISTANCE:** 5.0x ATR (If structural stop requires >5x ATR, return 'WAIT').
-            - **Take Profit / Management:**
-                - **Trend Days:** Use `use_trailing_stop=True` for uncapped upside.
-                - **Range Days:** Use `use_trailing_stop=False` and target a fixed Resistance/Support level (R:R > 1.5).
-            - **Plan Validity (Time):**
-                - **BUY/SELL:** Set `validity_time_minutes` to 15-30 mins for fast breakout setups. If the breakout doesn't happen quickly, the setup is invalid. Use 60 mins only for major structural levels.
-                - **WAIT:** The system will automatically re-evaluate in 5 minutes. You do not need to specify a duration for WAIT.
-
-            ### 3. Contrarian Checks
-            - **Retail Sentiment:** If >70% Long, be cautious of Longs (Crowded Trade). If >70% Short, look for Short Squeezes.
-            - **News:** High-Impact Negative News overrides Bullish Technicals (and vice versa).
-
-            ### 4. Output Format
-            - Think deeply about the setup using your internal monologue.
-            - Output the final decision ONLY as a structured JSON object matching the requested schema.
-            - If the setup is unclear, weak, or violates rules, return `action: "WAIT"`.
-            """
+        path = os.path.join(self.cache_dir, f"{key}.txt")
+        if not os.path.exists(path):
+            return None
+
+        try:
+            if (time.time() - os.path.getmtime(path)) > self.cache_ttl:
+                logger.debug(f"Gemini response cache expired for {key}")
+                return None
+
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            logger.info(f"Loaded Gemini response {key} from cache.")
+            return text
+        except Exception as e:
+            logger.warning(f"Failed to load Gemini response cache for {key}: {e}")
+            return None
+
+    def _save_cached_response(self, key: str, text: str):
+        if not self.use_cache:
+            return
+
+        path = os.path.join(self.cache_dir, f"{key}.txt")
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        except Exception as e:
+            logger.warning(f"Failed to save Gemini response cache for {key}: {e}")
+
+    def _create_context_cache(self) -> typing.Optional[str]:
+        """
+        Creates a context cache of the system instruction and returns its name,
+        or None if the instruction is below the model's minimum cache size.
+        """
+        # The Gemini API can't count a system_instruction, so count it as content
+        count = self.client.models.count_tokens(
+            model=self.model_name, contents=self.system_instruction
+        )
+        tokens = count.total_tokens or 0
+        if tokens < _context_cache_min_tokens(self.model_name):
+            logger.info(
+                f"Gemini system instruction is {tokens} tokens, below the context "
+                f"cache minimum for {self.model_name}; sending it inline."
+            )
+            return None
+
+        cache = self.client.caches.create(
+            model=self.model_name,
+            config=types.CreateCachedContentConfig(
+                display_name="trader-analysis-system-instruction",
+                system_instruction=self.system_instruction,
+                ttl=f"{CONTEXT_CACHE_TTL_SECONDS}s",
+            ),
+        )
+        logger.info(f"Created Gemini context cache: {cache.name}")
+        return cache.name
+
+    def _get_context_cache_name(self) -> typing.Optional[str]:
+        """
+        Returns the name of a live context cache for this analyst's system
+        instruction (None if it can't be cached), creating or refreshing the
+        shared one if needed. Only one analyst creates it at a time.
+        """
+        with _CONTEXT_CACHES_LOCK:
+            entry = _CONTEXT_CACHES.get(self._context_cache_key)
+            if entry is not None and time.monotonic() < entry[1]:
+                future = entry[0]
+            else:
+                future = None
+                # Waiters share this future until the creation below finishes
+                own_future = concurrent.futures.Future()
+                _CONTEXT_CACHES[self._context_cache_key] = (own_future, math.inf)
+
+        if future is not None:
+            # Bounded, so a stuck creation degrades to inline instructions
+            return future.result(timeout=CONTEXT_CACHE_WAIT_SECONDS)
+
+        try:
+            name = self._create_context_cache()
+        except Exception as e:
+            if _is_cache_too_small_error(e):
+                deadline = math.inf
+            else:
+                deadline = time.monotonic() + CONTEXT_CACHE_RETRY_SECONDS
+            self._record_context_cache(own_future, deadline)
+            own_future.set_exception(e)
+            raise
+        else:
+            if name is None:
+                deadline = math.inf
+            else:
+                # Refresh a minute early so requests never reference an expired cache
+                deadline = time.monotonic() + CONTEXT_CACHE_TTL_SECONDS - 60
+            self._record_context_cache(own_future, deadline)
+            own_future.set_result(name)
+            return name
+        finally:
+            if not own_future.done():
+                # Interrupted (KeyboardInterrupt, cancellation): forget the
+                # attempt so the next caller retries, and release any waiters
+                self._record_context_cache(own_future, None)
+                own_future.set_exception(
+                    RuntimeError("Gemini context cache creation was interrupted")
+                )
+
+    def _record_context_cache(
+        self, future: concurrent.futures.Future, deadline: typing.Optional[float]
+    ):
+        """
+        Sets the deadline of this analyst's registry entry (or drops it, for
+        None) if the entry still belongs to the given future.
+        """
+        with _CONTEXT_CACHES_LOCK:
+            entry = _CONTEXT_CACHES.get(self._context_cache_key)
+            if entry is None or entry[0] is not future:
+                return
+            if deadline is None:
+                del _CONTEXT_CACHES[self._context_cache_key]
+            else:
+                _CONTEXT_CACHES[self._context_cache_key] = (future, deadline)
+
+    def _get_analyze_config(self) -> types.GenerateContentConfig:
+        """
+        Returns the analyze_market config, referencing a context cache of the
+        system instruction when the instruction is large enough to cache.
+        Otherwise (or if caching fails) the instruction is sent inline.
+        """
+        if self._context_cache_unavailable:
+            return self._analyze_config
+
+        try:
+            cache_name = self._get_context_cache_name()
+        except Exception as e:
+            if _is_cache_too_small_error(e):
+                logger.info(f"Gemini rejected the context cache, sending inline: {e}")
+                self._context_cache_unavailable = True
+            else:
+                # Transient (rate limit, 5xx, timeout); retried once the failure expires
+                logger.warning(
+                    f"Gemini context cache failed, sending system instruction inline: {e}"
+                )
+            self._cached_analyze_config = None
+            return self._analyze_config
+
+        if cache_name is None:
+            self._context_cache_unavailable = True
+            return self._analyze_config
+
+        if (
+            self._cached_analyze_config is None
+            or self._cached_analyze_config.cached_content != cache_name
+        ):
+            # The response schema can't live in the cache, so it stays per request
+            self._cached_analyze_config = types.GenerateContentConfig(
+                cached_content=cache_name,
+                response_mime_type="application/json",
+                response_schema=self._TRADING_SCHEMA,
+                thinking_config=self._THINKING_CONFIG,
+            )
+        return self._cached_analyze_config
+
+    async def _get_analyze_config_async(self) -> types.GenerateContentConfig:
+        """
+        _get_analyze_config for coroutines; any token count or cache creation
+        round trip runs in a worker thread so the event loop isn't blocked.
+        """
+        if self._context_cache_unavailable:
+            return self._analyze_config
+        return await asyncio.to_thread(self._get_analyze_config)
+
+    @staticmethod
+    def _log_thoughts(response, title: str):
+        """
+        Logs any thought parts of a response; skipped entirely unless INFO is enabled.
+        """
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        for part in response.candidates[0].content.parts:
+            if part.thought:
+                logger.info(
+                    "--- Gemini %s Thoughts ---\n%s\n-------------------------------",
+                    title,
+                    part.text,
+                )
+
+    def _signal_from_response(self, response) -> typing.Optional[TradingSignal]:
+        """
+        Logs usage/thoughts for an analysis response and parses it into a TradingSignal.
+        """
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None and usage.cached_content_token_count:
+            logger.info(
+                "Gemini analysis used %s cached of %s prompt tokens",
+                usage.cached_content_token_count,
+                usage.prompt_token_count,
+            )
+
+        # Log thoughts if available for transparency
+        self._log_thoughts(response, "Analysis")
+
+        # The SDK with response_schema automatically handles the schema enforcement
+        if not response.text:
+            candidate = response.candidates[0]
+            error_msg = f"Gemini returned empty response text. Finish Reason: {candidate.finish_reason}, Safety Ratings: {candidate.safety_ratings}"
+            if candidate.finish_reason in BLOCKED_FINISH_REASONS:
+                logger.error(f"{error_msg} - Not retrying a blocked response.")
+                return None
+            logger.warning(
+                f"{error_msg} - Raising EmptyGeminiResponseError to trigger retry."
+            )
+            raise EmptyGeminiResponseError(error_msg)
+
+        # Parsed and validated in one pass by pydantic-core; missing
+        # entry_type/use_trailing_stop fall back to the model defaults
+        return TradingSignal.model_validate_json(response.text)
+
+    def _handle_analysis_error(
+        self, e: Exception, config, label: str = "analysis"
+    ) -> None:
+        """
+        Shared except handling for analysis requests: re-raises what
+        @gemini_retry should retry (including a 404 on the context cache, which
+        is rebuilt on the retry) and logs everything else as final.
+        """
+        if isinstance(e, errors.ClientError):
+            if e.code in TRANSIENT_CLIENT_ERROR_CODES:
+                raise e
+            if (
+                e.code == 404
+                and config is not None
+                and config is self._cached_analyze_config
+            ):
+                # Cache was evicted server-side; rebuild it on the retry
+                _forget_context_cache(self._context_cache_key, config.cached_content)
+                self._cached_analyze_config = None
+                raise ContextCacheExpiredError(str(e)) from e
+            logger.error(f"Non-retriable error during Gemini {label}: {e}")
+        elif isinstance(e, ValidationError):
+            logger.error(f"Non-retriable error during Gemini {label}: {e}")
+        elif isinstance(e, RETRIABLE_GEMINI_ERRORS):
+            # Let @retry see these
+            raise e
+        else:
+            logger.error(f"Unexpected error during Gemini {label}: {e}")
+
+    def _prepare_analysis(
+        self, market_data_context: str, strategy_name: str
+    ) -> typing.Tuple[str, str, typing.Optional[TradingSignal]]:
+        """
+        Builds the analysis prompt and its response cache key, and returns the
+        cached signal for it if there is one.
+        """
+        prompt = _analysis_prompt(market_data_context, strategy_name)
+        cache_key = self._get_response_cache_key(
+            "analysis", self.system_instruction, prompt
+        )
+        cached = self._load_cached_response(cache_key)
+        if cached is not None:
+            try:
+                return prompt, cache_key, TradingSignal.model_validate_json(cached)
+            except ValidationError as e:
+                logger.warning(
+                    f"Ignoring invalid cached Gemini response {cache_key}: {e}"
+                )
+        return prompt, cache_key, None
+
+    def _finish_analysis(
+        self, response, cache_key: str
+    ) -> typing.Optional[TradingSignal]:
+        """
+        Parses an analysis response and caches it when it produced a signal.
+        """
+        signal = self._signal_from_response(response)
+        if signal is not None:
+            self._save_cached_response(cache_key, response.text)
+        return signal
 
-    @retry(
-        stop=stop_after_attempt(2),  # Try once, then retry once = 2 attempts total
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type(
-            (errors.ServerError, errors.APIError, EmptyGeminiResponseError)
-        ),
-        reraise=True,  # Let the final exception bubble up to be caught by the try/except block inside
-    )
     def analyze_market(
         self,
         market_data_context: str,
         strategy_name: str = "Market Open",
     ) -> typing.Optional[TradingSignal]:
         """
-        Sends market data to Gemini and returns a structured TradingSignal.
+        Sends market data to Gemini and returns a structured TradingSignal,
+        escalating low-confidence trade signals if an escalation model is set.
+        """
+        signal = self._analyze_market_once(market_data_context, strategy_name)
+        return self._escalate(signal, market_data_context, strategy_name)
+
+    def _start_escalation(self, signal: TradingSignal) -> "GeminiAnalyst":
+        """
+        Counts and logs an escalation and returns the analyst to escalate to.
+        """
+        self.escalation_count += 1
+        logger.info(
+            f"Low-confidence {signal.action.value} signal from {self.model_name}; "
+            f"escalating to {self.escalation_model} (escalation #{self.escalation_count})."
+        )
+        if self._escalation_analyst is None:
+            self._escalation_analyst = GeminiAnalyst(
+                model_name=self.escalation_model,
+                use_cache=self.use_cache,
+                cache_ttl=self.cache_ttl,
+                escalation_model=None,
+            )
+        return self._escalation_analyst
+
+    def _escalate(
+        self,
+        signal: typing.Optional[TradingSignal],
+        market_data_context: str,
+        strategy_name: str,
+    ) -> typing.Optional[TradingSignal]:
+        """
+        Re-analyzes a low-confidence trade signal on the escalation model,
+        keeping the original if that fails. Other signals pass through.
+        """
+        if not self._should_escalate(signal):
+            return signal
+        escalation_analyst = self._start_escalation(signal)
+        try:
+            escalated = escalation_analyst._analyze_market_once(
+                market_data_context, strategy_name
+            )
+        except Exception as e:
+            logger.error(f"Escalated Gemini analysis failed, keeping original: {e}")
+            return signal
+        return escalated if escalated is not None else signal
+
+    async def _escalate_async(
+        self,
+        signal: typing.Optional[TradingSignal],
+        market_data_context: str,
+        strategy_name: str,
+    ) -> typing.Optional[TradingSignal]:
+        """
+        Async variant of _escalate using the escalation analyst's aio transport.
+        """
+        if not self._should_escalate(signal):
+            return signal
+        escalation_analyst = self._start_escalation(signal)
+        try:
+            escalated = await escalation_analyst._analyze_market_once_async(
+                market_data_context, strategy_name
+            )
+        except Exception as e:
+            logger.error(f"Escalated Gemini analysis failed, keeping original: {e}")
+            return signal
+        return escalated if escalated is not None else signal
+
+    def _should_escalate(self, signal: typing.Optional[TradingSignal]) -> bool:
+        return (
+            self.escalation_model is not None
+            and signal is not None
+            and signal.action in (Action.BUY, Action.SELL)
+            and signal.confidence.strip().lower() == "low"
+        )
+
+    @gemini_retry
+    def _analyze_market_once(
+        self,
+        market_data_context: str,
+        strategy_name: str = "Market Open",
+    ) -> typing.Optional[TradingSignal]:
+        """
+        Single analysis on this analyst's model (with retries).
+        """
+        prompt, cache_key, cached = self._prepare_analysis(
+            market_data_context, strategy_name
+        )
+        if cached is not None:
+            return cached
+
+        config = None
+        try:
+            config = self._get_analyze_config()
+            response = self.client.models.generate_content(
+                model=self.model_name,
+                contents=prompt,
+                config=config,
+            )
+            return self._finish_analysis(response, cache_key)
+        except Exception as e:
+            return self._handle_analysis_error(e, config)
+
+    async def analyze_market_async(
+        self,
+        market_data_context: str,
+        strategy_name: str = "Market Open",
+    ) -> typing.Optional[TradingSignal]:
+        """
+        Async variant of analyze_market using the client's native aio transport.
+        """
+        signal = await self._analyze_market_once_async(
+            market_data_context, strategy_name
+        )
+        return await self._escalate_async(signal, market_data_context, strategy_name)
+
+    @gemini_retry
+    async def _analyze_market_once_async(
+        self,
+        market_data_context: str,
+        strategy_name: str = "Market Open",
+    ) -> typing.Optional[TradingSignal]:
         """
+        Async variant of _analyze_market_once.
+        """
+        prompt, cache_key, cached = self._prepare_analysis(
+            market_data_context, strategy_name
+        )
+        if cached is not None:
+            return cached
+
+        config = None
         try:
-            prompt = f"Analyze the following {strategy_name} market data and generate a trading signal:\n\n{market_data_context}"
+            config = await self._get_analyze_config_async()
+            response = await self.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=prompt,
+                config=config,
+            )
+            return self._finish_analysis(response, cache_key)
+        except Exception as e:
+            return self._handle_analysis_error(e, config)
+
+    async def analyze_markets_async(
+        self,
+        contexts: typing.Sequence[typing.Tuple[str, str]],
+    ) -> typing.List[typing.Optional[TradingSignal]]:
+        """
+        Analyzes several (market_data_context, strategy_name) pairs concurrently.
+        Results are returned in input order; a failed analysis yields None.
+        """
+        results = await asyncio.gather(
+            *(
+                self.analyze_market_async(context, strategy_name=strategy_name)
+                for context, strategy_name in contexts
+            ),
+            return_exceptions=True,
+        )
+        signals = []
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.error(f"Gemini analysis failed after retries: {result}")
+                signals.append(None)
+            else:
+                signals.append(result)
+        return signals
 
+    def analyze_markets(
+        self,
+        contexts: typing.Sequence[typing.Tuple[str, str]],
+    ) -> typing.List[typing.Optional[TradingSignal]]:
+        """
+        Blocking wrapper around analyze_markets_async for callers without an event loop.
+        """
+        return asyncio.run(self.analyze_markets_async(contexts))
+
+    def analyze_markets_batch(
+        self,
+        contexts: typing.Sequence[typing.Tuple[str, str]],
+    ) -> typing.List[typing.Optional[TradingSignal]]:
+        """
+        Analyzes several (market_data_context, strategy_name) pairs in a single
+        Gemini request, sharing the system instruction and schema overhead.
+        Returns one signal per context in input order, or all None on failure.
+        Low-confidence trade signals are escalated individually.
+        """
+        signals = self._analyze_markets_batch_once(contexts)
+        return [
+            self._escalate(signal, context, strategy_name)
+            for signal, (context, strategy_name) in zip(signals, contexts)
+        ]
+
+    @gemini_retry
+    def _analyze_markets_batch_once(
+        self,
+        contexts: typing.Sequence[typing.Tuple[str, str]],
+    ) -> typing.List[typing.Optional[TradingSignal]]:
+        """
+        Single batch request on this analyst's model (with retries).
+        """
+        if not contexts:
+            return []
+
+        failed = [None] * len(contexts)
+        config = None
+        try:
+            sections = "\n\n".join(
+                f"=== Market {i}: {strategy_name} ===\n{context}"
+                for i, (context, strategy_name) in enumerate(contexts, start=1)
+            )
+            prompt = (
+                f"Analyze each of the following {len(contexts)} markets independently and "
+                f"return a JSON array with exactly one trading signal per market, in the same order:\n\n{sections}"
+            )
+
+            config = self._get_analyze_config()
             response = self.client.models.generate_content(
                 model=self.model_name,
                 contents=prompt,
-                config=types.GenerateContentConfig(
-                    system_instruction=self.system_instruction,
-                    response_mime_type="application/json",
-                    response_schema=TradingSignal.model_json_schema(),
-                    thinking_config=types.ThinkingConfig(
-                        include_thoughts=True,
-                        thinking_level="HIGH",
-                    ),
+                config=config.model_copy(
+                    update={"response_schema": self._BATCH_TRADING_SCHEMA}
                 ),
             )
 
-            # Log thoughts if available for transparency
-            for part in response.candidates[0].content.parts:
-                if part.thought:
-                    logger.info(
-                        f"--- Gemini Analysis Thoughts ---\n{part.text}\n-------------------------------"
-                    )
+            self._log_thoughts(response, "Batch Analysis")
 
-            # The SDK with response_schema automatically handles the schema enforcement
             if not response.text:
-                candidate = response.candidates[0]
-                error_msg = f"Gemini returned empty response text. Finish Reason: {candidate.finish_reason}, Safety Ratings: {candidate.safety_ratings}"
-                logger.warning(
-                    f"{error_msg} - Raising EmptyGeminiResponseError to trigger retry."
-                )
+                finish_reason = response.candidates[0].finish_reason
+                error_msg = f"Gemini returned empty batch response. Finish Reason: {finish_reason}"
+                if finish_reason in BLOCKED_FINISH_REASONS:
+                    logger.error(f"{error_msg} - Not retrying a blocked response.")
+                    return failed
                 raise EmptyGeminiResponseError(error_msg)
 
-            signal_data = json.loads(response.text)
-            # Handle potential missing entry_type from older models or if omitted (default fallback)
-            if "entry_type" not in signal_data:
-                signal_data["entry_type"] = EntryType.INSTANT
-            if "use_trailing_stop" not in signal_data:
-                signal_data["use_trailing_stop"] = (
-                    True  # Default to True (original behavior)
+            signals = self._SIGNAL_LIST_ADAPTER.validate_json(response.text)
+            if len(signals) != len(contexts):
+                logger.error(
+                    f"Gemini batch analysis returned {len(signals)} signals for {len(contexts)} markets."
                 )
-            return TradingSignal(**signal_data)
+                return failed
+            return signals
 
-        except (errors.ClientError, json.JSONDecodeError) as e:
-            logger.error(f"Non-retriable error during Gemini analysis: {e}")
-            return None
         except Exception as e:
-            # If the error is a retriable one, reraise it to trigger @retry
-            if isinstance(
-                e, (errors.ServerError, errors.APIError, EmptyGeminiResponseError)
-            ):
-                raise e
-            logger.error(f"Unexpected error during Gemini analysis: {e}")
-            return None
+            self._handle_analysis_error(e, config, "batch analysis")
+            return failed
 
     def assess_news_quality(
         self,
@@ -236,43 +967,39 @@ class GeminiAnalyst:
             {news_text}
             """
 
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=NewsQuality.model_json_schema(),
-                    thinking_config=types.ThinkingConfig(
-                        include_thoughts=True,
-                        thinking_level="HIGH",
-                    ),
-                ),
-            )
+            response = self._generate_content(prompt, self._news_config)
 
             # Log thoughts if available
-            for part in response.candidates[0].content.parts:
-                if part.thought:
-                    logger.info(
-                        f"--- Gemini News Assessment Thoughts ---\n{part.text}\n-------------------------------"
-                    )
+            self._log_thoughts(response, "News Assessment")
 
             if not response.text:
                 logger.error("Gemini returned empty response for news assessment.")
                 return None
 
-            return NewsQuality(**json.loads(response.text))
+            return NewsQuality.model_validate_json(response.text)
 
         except Exception as e:
             logger.error(f"Error during news assessment: {e}")
             return None
 
-    def generate_post_mortem(
-        self,
+    @gemini_retry
+    def _generate_content(self, contents, config: types.GenerateContentConfig):
+        """
+        Single generate_content call with the shared transient-error retry policy.
+        """
+        return self.client.models.generate_content(
+            model=self.model_name,
+            contents=contents,
+            config=config,
+        )
+
+    @staticmethod
+    def _build_post_mortem_prompt(
         trade_data: dict,
-        price_history_df: pd.DataFrame = None,
+        price_history_df: "pd.DataFrame" = None,
     ) -> str:
         """
-        Generates a post-mortem analysis for a completed trade.
+        Builds the per-trade data block sent for a post-mortem.
         """
         log = trade_data.get("log", {})
         monitor = trade_data.get("monitor", [])
@@ -281,9 +1008,15 @@ class GeminiAnalyst:
         if monitor:
             start_price = monitor[0]["bid"]
             end_price = monitor[-1]["bid"]
-            min_pnl = min((row["pnl"] for row in monitor), default=0)
-            max_pnl = max((row["pnl"] for row in monitor), default=0)
             final_pnl = monitor[-1]["pnl"]
+            # Single pass over the ticks; no need to build a frame just for min/max
+            min_pnl = max_pnl = monitor[0]["pnl"]
+            for row in monitor:
+                pnl = row["pnl"]
+                if pnl < min_pnl:
+                    min_pnl = pnl
+                elif pnl > max_pnl:
+                    max_pnl = pnl
         else:
             # Fallback to trade_log data if monitoring data is missing
             start_price = log.get("entry", "N/A")
@@ -305,50 +1038,75 @@ class GeminiAnalyst:
         if price_history_df is not None and not price_history_df.empty:
             # Create a simplified string representation of the candle data
             # Resample to 5-minute candles if too granular to save tokens
+            import pandas as pd
+
             try:
+                # Work on a copy of just the OHLCV columns so the caller's frame is untouched
+                cols = [
+                    col
+                    for col in ["open", "high", "low", "close", "volume"]
+                    if col in price_history_df.columns
+                ]
+                df = price_history_df[cols].apply(pd.to_numeric, errors="coerce")
+
                 # Ensure index is datetime
-                if not isinstance(price_history_df.index, pd.DatetimeIndex):
-                    price_history_df.index = pd.to_datetime(price_history_df.index)
-
-                # Ensure columns are numeric
-                cols = ["open", "high", "low", "close", "volume"]
-                for col in cols:
-                    if col in price_history_df.columns:
-                        price_history_df[col] = pd.to_numeric(
-                            price_history_df[col], errors="coerce"
-                        )
-
-                # Simple summary statistics
-                period_high = price_history_df["high"].max()
-                period_low = price_history_df["low"].min()
-                period_open = price_history_df["open"].iloc[0]
-                period_close = price_history_df["close"].iloc[-1]
-
-                # Candle Data (Last 20 5-min bars)
+                if not isinstance(df.index, pd.DatetimeIndex):
+                    df.index = pd.to_datetime(df.index)
+
                 agg_dict = {
                     "open": "first",
                     "high": "max",
                     "low": "min",
                     "close": "last",
                 }
-                if "volume" in price_history_df.columns:
+                if "volume" in df.columns:
                     agg_dict["volume"] = "sum"
 
+                # Only resample when there are more bars than we show and they're
+                # finer than 5 minutes; otherwise the raw bars go in as-is.
+                # Resampling covers the whole frame once so the summary stats
+                # below come from the (smaller) aggregated bars.
+                bar_spacing = df.index.to_series().diff().median()
+                if len(df) > RESAMPLE_MIN_ROWS and bar_spacing < pd.Timedelta(
+                    minutes=5
+                ):
+                    bars = df.resample("5Min").agg(agg_dict).dropna(subset=["close"])
+                    candle_unit = "5-min bars"
+                else:
+                    bars = df[list(agg_dict)]
+                    candle_unit = "bars"
+                candles = bars.tail(20)
+                candle_label = f"Last {len(candles)} {candle_unit}"
+
+                # Simple summary statistics (identical on raw or aggregated bars)
+                period_high = bars["high"].max()
+                period_low = bars["low"].min()
+                period_open = bars["open"].iloc[0]
+                period_close = bars["close"].iloc[-1]
+
                 price_history_context = f"""
         **Broader Market Context (1 Hour before to Present):**
         - Period High: {period_high}
         - Period Low: {period_low}
         - Open: {period_open}
         - Close: {period_close}
-        - Candle Data (Last 20 5-min bars):
-        {price_history_df.resample("5Min").agg(agg_dict).tail(20).to_string()}
+        - Candle Data ({candle_label}, CSV):
+        {candles.to_csv(index=True, index_label="timestamp", float_format="%.4f")}
         """
             except Exception as e:
                 price_history_context = f"Could not process price history: {e}"
 
+        # Short monitors are sent whole instead of as overlapping head/tail slices
+        if len(monitor) <= MONITOR_SAMPLE_FULL_MAX:
+            monitor_label = "All"
+            monitor_sample = _format_monitor_rows(monitor)
+        else:
+            monitor_label = "First 5, Last 5"
+            monitor_sample = f"{_format_monitor_rows(monitor[:5])}\n...\n{_format_monitor_rows(monitor[-5:])}"
+
+        # Static instructions live in the config's system instruction so this
+        # per-trade data is the only thing that changes between requests
         prompt = f"""
-        You are a senior trading risk manager conducting a post-mortem analysis.
-        
         **Trade Log:**
         - Entry: {log.get("entry")}
         - Initial Stop Loss: {log.get("initial_stop_loss", "N/A")} (Use this for validation checks)
@@ -368,76 +1126,49 @@ class GeminiAnalyst:
         
         {price_history_context}
         
-        **Monitoring Data Sample (First 5, Last 5):**
-        {monitor[:5]}
-        ...
-        {monitor[-5:]}
-        
-        **Analysis Required:**
-        1. Did the trade follow the plan?
-        2. Was the stop loss too tight given the price action?
-        3. Did slippage or spread impact the result significantly?
-        4. Was the original reasoning sound based on the outcome?
-        5. What is the key lesson for next time?
-        
-        Provide a concise, bulleted report.
+        **Monitoring Data Sample ({monitor_label}):**
+        {monitor_sample}
         """
+        return prompt
 
-        try:
-            # Create config with safety settings
-            # Using dictionary format which is often supported, or referencing types if needed.
-            # For google-genai, usage of types is preferred.
-
-            safety_settings = [
-                types.SafetySetting(
-                    category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_NONE"
-                ),
-                types.SafetySetting(
-                    category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_NONE"
-                ),
-                types.SafetySetting(
-                    category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="BLOCK_NONE"
-                ),
-                types.SafetySetting(
-                    category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="BLOCK_NONE"
-                ),
-            ]
-
-            config = types.GenerateContentConfig(
-                temperature=0.2,
-                max_output_tokens=8192,
-                safety_settings=safety_settings,
-                thinking_config=types.ThinkingConfig(
-                    include_thoughts=True,
-                    thinking_level="HIGH",
-                ),
-            )
+    def generate_post_mortem(
+        self,
+        trade_data: dict,
+        price_history_df: "pd.DataFrame" = None,
+    ) -> str:
+        """
+        Generates a post-mortem analysis for a completed trade.
+        """
+        prompt = self._build_post_mortem_prompt(trade_data, price_history_df)
+        cache_key = self._get_response_cache_key(
+            "post_mortem", POST_MORTEM_INSTRUCTIONS, prompt
+        )
+        cached = self._load_cached_response(cache_key)
+        if cached is not None:
+            return cached
 
-            response = self.client.models.generate_content(
-                model=self.model_name, contents=prompt, config=config
-            )
+        try:
+            response = self._generate_content(prompt, self._post_mortem_config)
 
             # Log thoughts if available
-            for part in response.candidates[0].content.parts:
-                if part.thought:
-                    logger.info(
-                        f"--- Gemini Post-Mortem Thoughts ---\n{part.text}\n-------------------------------"
-                    )
+            self._log_thoughts(response, "Post-Mortem")
 
-            # Safely access text
+            # Safely access text: join the answer parts once (thoughts were logged above)
             if response.candidates:
                 candidate = response.candidates[0]
-                if candidate.content and candidate.content.parts:
-                    return response.text
-                elif candidate.finish_reason == types.FinishReason.SAFETY:  # SAFETY
-                    return f"Analysis blocked by safety filters. Ratings: {candidate.safety_ratings}"
-                elif (
-                    candidate.finish_reason == types.FinishReason.MAX_TOKENS
-                ):  # MAX_TOKENS
-                    try:
-                        return response.text + "\n[TRUNCATED]"
-                    except Exception:
-                        return "Analysis truncated and text inaccessible."
+                parts = candidate.content.parts if candidate.content else None
+                text = "".join(
+                    part.text for part in parts or () if part.text and not part.thought
+                )
+                if text:
+                    if candidate.finish_reason == types.FinishReason.MAX_TOKENS:
+                        return text + "\n[TRUNCATED]"
+                    self._save_cached_response(cache_key, text)
+                    return text
+                elif candidate.finish_reason in BLOCKED_FINISH_REASONS:
+                    return f"Analysis blocked ({candidate.finish_reason}). Ratings: {candidate.safety_ratings}"
+                elif candidate.finish_reason == types.FinishReason.MAX_TOKENS:
+                    return "Analysis truncated before any text was returned."
                 else:
                     return f"Analysis finished with reason {candidate.finish_reason} but no text returned."
             else:
@@ -447,6 +1178,91 @@ class GeminiAnalyst:
             logger.error(f"Gemini Post-Mortem Error: {e}")
             return "Analysis failed."
 
+    @gemini_retry
+    def _open_stream(self, contents, config: types.GenerateContentConfig):
+        """
+        Opens a generate_content stream and waits for its first chunk, so the
+        retry policy covers connecting but never replays text already yielded.
+        """
+        stream = iter(
+            self.client.models.generate_content_stream(
+                model=self.model_name,
+                contents=contents,
+                config=config,
+            )
+        )
+        first = next(stream, None)
+        return stream if first is None else itertools.chain((first,), stream)
+
+    def stream_post_mortem(
+        self,
+        trade_data: dict,
+        price_history_df: "pd.DataFrame" = None,
+    ) -> typing.Iterator[str]:
+        """
+        Streams a post-mortem analysis as text chunks while Gemini generates it.
+        Finish reasons and the response cache are handled the same way as
+        generate_post_mortem. last_post_mortem_complete is only set once a
+        full report was streamed (or replayed from the cache), and
+        last_post_mortem_truncated when text was cut off at MAX_TOKENS.
+        """
+        self.last_post_mortem_complete = False
+        self.last_post_mortem_truncated = False
+        prompt = self._build_post_mortem_prompt(trade_data, price_history_df)
+        cache_key = self._get_response_cache_key(
+            "post_mortem", POST_MORTEM_INSTRUCTIONS, prompt
+        )
+        cached = self._load_cached_response(cache_key)
+        if cached is not None:
+            self.last_post_mortem_complete = True
+            yield cached
+            return
+
+        texts = []
+        finish_reason = None
+        safety_ratings = None
+
+        try:
+            for chunk in self._open_stream(prompt, self._post_mortem_config):
+                if not chunk.candidates:
+                    continue
+                candidate = chunk.candidates[0]
+                finish_reason = candidate.finish_reason or finish_reason
+                safety_ratings = candidate.safety_ratings or safety_ratings
+                if not (candidate.content and candidate.content.parts):
+                    continue
+                for part in candidate.content.parts:
+                    if part.thought:
+                        if logger.isEnabledFor(logging.INFO):
+                            logger.info(
+                                "--- Gemini Post-Mortem Thoughts ---\n%s", part.text
+                            )
+                    elif part.text:
+                        texts.append(part.text)
+                        yield part.text
+
+        except Exception as e:
+            logger.error(f"Gemini Post-Mortem Error: {e}")
+            yield "\n[Analysis interrupted.]" if texts else "Analysis failed."
+            return
+
+        if finish_reason == types.FinishReason.MAX_TOKENS:
+            if texts:
+                self.last_post_mortem_truncated = True
+                yield "\n[TRUNCATED]"
+            else:
+                yield "Analysis truncated before any text was returned."
+        elif not texts:
+            if finish_reason in BLOCKED_FINISH_REASONS:
+                yield f"Analysis blocked ({finish_reason}). Ratings: {safety_ratings}"
+            elif finish_reason is None:
+                yield "No candidates returned from Gemini."
+            else:
+                yield f"Analysis finished with reason {finish_reason} but no text returned."
+        else:
+            self._save_cached_response(cache_key, "".join(texts))
+            self.last_post_mortem_complete = True
+
 
 if __name__ == "__main__":
     # Simple manual test (requires valid API key in .env)
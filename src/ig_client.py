@@ -1,28 +1,191 @@
+import atexit
+import concurrent.futures
+import functools
+import hashlib
 import logging
+import pickle
+import time
 import pandas as pd
-from typing import Optional
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import requests
 from dotenv import dotenv_values
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from tenacity import (
     retry,
     stop_after_attempt,
-    wait_exponential,
+    wait_random_exponential,
     retry_if_exception_type,
 )
 from trading_ig import IGService
-from trading_ig.rest import IGException
+from trading_ig.rest import ApiExceededException, IGException
 from config import IG_API_KEY, IG_USERNAME, IG_PASSWORD, IG_ACC_ID, IS_LIVE, ROOT_DIR
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Default timeout for every IG REST call that doesn't set its own
+HTTP_TIMEOUT_SECONDS = 10
+
+# Connection pool sizing for the IG REST sessions (requests defaults to 10/10)
+HTTP_POOL_CONNECTIONS = 20
+HTTP_POOL_MAXSIZE = 50
+
+# Transport-level retries for connection failures only (the request never
+# reached IG). HTTP errors and rate limits are left to ig_retry, the single
+# layer with jittered, capped backoff, so one call can't fan out into
+# stacked urllib3 and tenacity retries or an uncapped Retry-After wait.
+HTTP_RETRY = Retry(
+    total=2,
+    connect=2,
+    read=0,
+    status=0,
+    other=0,
+    backoff_factor=0.5,
+    allowed_methods=frozenset({"GET"}),
+    respect_retry_after_header=False,
+    raise_on_status=False,  # Hand the last response back so trading_ig reports it
+)
+
+# On-disk cache for historical ranges that have fully closed (they never change)
+HIST_CACHE_DIR = ROOT_DIR / ".cache" / "hist"
+# IG can still revise the most recent bars, so a range is only treated as
+# closed once it ended at least this many bars ago
+HIST_CACHE_SETTLE_BARS = 5
+# Lifetime of cached closed ranges; a range still forming is kept for one bar
+HIST_CACHE_TTL_SECONDS = 90 * 24 * 3600
+# Empty replies may be transient or partial, so they are only trusted briefly
+HIST_EMPTY_CACHE_TTL_SECONDS = 15 * 60
+
+# How long an open-positions snapshot answers deal ID lookups before refetching
+POSITIONS_CACHE_TTL_SECONDS = 2.0
+# Market info carries the live bid/offer snapshot, so it is only reused briefly
+MARKET_INFO_CACHE_TTL_SECONDS = 5.0
+
+# IG price frame columns -> the lowercase OHLCV names used downstream
+HIST_COLUMN_RENAMES = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Volume": "volume",
+}
+
+# Concurrent historical fetches per batch; well under the mounted pool size
+HIST_FETCH_WORKERS = 8
+
+# Fixed create_open_position arguments for a GBP market-order spread bet
+MARKET_SPREAD_BET_ORDER = {
+    "currency_code": "GBP",
+    "expiry": "DFB",  # DFB for Daily Funded Bet (Spread Bet)
+    "force_open": True,
+    "guaranteed_stop": False,
+    "level": None,  # MARKET orders execute at current price, level must be None
+    "limit_distance": None,
+    "order_type": "MARKET",
+    "quote_id": None,
+    "stop_distance": None,
+    "trailing_stop": False,  # Trailing stop is managed manually in TradeMonitorDB
+    "trailing_stop_increment": None,
+}
+
+# Re-poll delays (~0.3s total) while a deal confirmation isn't final yet
+CONFIRM_POLL_DELAYS = (0.02, 0.05, 0.1, 0.1)
+TERMINAL_DEAL_STATUSES = frozenset({"ACCEPTED", "REJECTED"})
+
+# Fixed close_open_position arguments for closing at market
+MARKET_CLOSE_ORDER = {"level": None, "order_type": "MARKET", "quote_id": None}
+
+# The only .env.live settings the hybrid data feed needs
+LIVE_ENV_KEYS = ("IS_LIVE", "IG_USERNAME", "IG_PASSWORD", "IG_API_KEY", "IG_ACC_ID")
+
+
+@functools.lru_cache(maxsize=1)
+def _load_live_env(path: str) -> dict:
+    """Parses .env.live once per process, keeping only LIVE_ENV_KEYS."""
+    values = dotenv_values(path)
+    return {key: values[key] for key in LIVE_ENV_KEYS if key in values}
+
+
+# requests' own ConnectionError/Timeout don't subclass the builtin ConnectionError
+RETRIABLE_IG_ERRORS = (
+    IGException,
+    ApiExceededException,
+    ConnectionError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+# Upper bound on a server-supplied Retry-After, so one header can't stall a worker
+MAX_RETRY_AFTER_SECONDS = 60.0
+
+_jittered_backoff = wait_random_exponential(multiplier=1, max=15)
+
+
+def _retry_after_seconds(exc: Optional[BaseException]) -> Optional[float]:
+    """Reads a Retry-After header (in seconds) off an exception's HTTP response."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers or "Retry-After" not in headers:
+        return None
+    try:
+        return min(max(float(headers["Retry-After"]), 0.0), MAX_RETRY_AFTER_SECONDS)
+    except (TypeError, ValueError):
+        return None
+
+
+def _wait_for_ig_retry(retry_state) -> float:
+    """Honours Retry-After on rate-limited responses, else jittered exponential backoff."""
+    outcome = retry_state.outcome
+    retry_after = _retry_after_seconds(outcome.exception() if outcome else None)
+    if retry_after is not None:
+        return retry_after
+    return _jittered_backoff(retry_state)
+
+
+def _log_ig_retry(retry_state):
+    fn_name = getattr(retry_state.fn, "__name__", "IG call")
+    logger.warning(
+        "%s failed (attempt %d): %s. Retrying in %.1fs...",
+        fn_name,
+        retry_state.attempt_number,
+        retry_state.outcome.exception(),
+        retry_state.next_action.sleep,
+    )
+
+
+# Shared retry policy for IG REST reads: jittered so concurrent workers don't
+# retry a rate-limited API in lockstep
+ig_retry = retry(
+    stop=stop_after_attempt(3),
+    wait=_wait_for_ig_retry,
+    retry=retry_if_exception_type(RETRIABLE_IG_ERRORS),
+    before_sleep=_log_ig_retry,
+)
+
 
 class IGClient:
+    # Fixed attribute layout: no per-instance __dict__ on the hot trading path
+    __slots__ = (
+        "service",
+        "data_service",
+        "live_data_config",
+        "authenticated",
+        "_positions_cache",
+        "_market_cache",
+        "_initialized",
+    )
+
     _instance = None
-    _initialized = False
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
-            cls._instance = super(IGClient, cls).__new__(cls)
+            instance = super(IGClient, cls).__new__(cls)
+            instance._initialized = False
+            # Once per instance, however many times IGClient() is called
+            atexit.register(instance.close)
+            cls._instance = instance
         return cls._instance
 
     def __init__(self):
@@ -58,9 +221,10 @@ class IGClient:
             env_live_path = ROOT_DIR / ".env.live"
             if env_live_path.exists():
                 logger.info(
-                    f"Detected .env.live at {env_live_path} - Attempting to configure Live Data Feed for Demo Bot..."
+                    "Detected .env.live at %s - Attempting to configure Live Data Feed for Demo Bot...",
+                    env_live_path,
                 )
-                config_live = dotenv_values(env_live_path)
+                config_live = _load_live_env(str(env_live_path))
 
                 # Check if it's actually enabled/live
                 if config_live.get("IS_LIVE", "false").lower() == "true":
@@ -79,23 +243,52 @@ class IGClient:
                         )
                     except Exception as e:
                         logger.error(
-                            f"Failed to initialize Live Data service: {e}. Reverting to Demo data."
+                            "Failed to initialize Live Data service: %s. Reverting to Demo data.",
+                            e,
                         )
                         self.data_service = self.service
 
         self.authenticated = False
+        # (fetched_at, {dealId: position}) snapshot of open positions
+        self._positions_cache = None
+        # {epic: (fetched_at, market_info)}
+        self._market_cache = {}
         self._initialized = True
 
     def _apply_timeout_patch(self, service_obj):
-        """Enforces default timeout on the session."""
-        original_request = service_obj.session.request
+        """
+        Enforces default timeout on the session and mounts a larger keep-alive
+        connection pool, so repeated REST calls reuse their TCP/TLS connections.
+        """
+        # An explicit timeout= from the caller still overrides the default
+        service_obj.session.request = functools.partial(
+            service_obj.session.request, timeout=HTTP_TIMEOUT_SECONDS
+        )
 
-        def timeout_request(*args, **kwargs):
-            if "timeout" not in kwargs:
-                kwargs["timeout"] = 10
-            return original_request(*args, **kwargs)
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_CONNECTIONS,
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+            max_retries=HTTP_RETRY,
+        )
+        service_obj.session.mount("https://", adapter)
+        service_obj.session.mount("http://", adapter)
+
+    def close(self):
+        """
+        Closes the HTTP sessions (and their pooled connections) of both services.
+        """
+        if not self._initialized:
+            return
+
+        services = [self.service]
+        if self.data_service is not self.service:
+            services.append(self.data_service)
 
-        service_obj.session.request = timeout_request
+        for service_obj in services:
+            try:
+                service_obj.session.close()
+            except Exception as e:
+                logger.warning("Failed to close IG session: %s", e)
 
     def _authenticate_service(
         self, service_obj, username, password, acc_id_target, env_label
@@ -113,82 +306,102 @@ class IGClient:
             if accounts_df.empty:
                 raise Exception(f"No trading accounts found for {env_label}.")
 
-            target_account = None
+            # A handful of rows at most, so plain dicts beat pandas masks here
+            accounts = accounts_df.to_dict("records")
+
             if acc_id_target:
                 # Filter by Account ID
-                filtered_accounts = accounts_df[
-                    accounts_df["accountId"] == acc_id_target
-                ]
-                if not filtered_accounts.empty:
-                    target_account = filtered_accounts.iloc[0]
-                else:
+                target_account = next(
+                    (a for a in accounts if a["accountId"] == acc_id_target), None
+                )
+                if target_account is None:
                     raise Exception(
                         f"Configured Account ID ({acc_id_target}) not found in {env_label} accounts."
                     )
             else:
                 # Preference logic
-                preferred_accounts = accounts_df[accounts_df["preferred"]]
-                if not preferred_accounts.empty:
-                    target_account = preferred_accounts.iloc[0]
-                elif not accounts_df.empty:
-                    target_account = accounts_df.iloc[0]
-                else:
-                    raise Exception(f"No preferred account found for {env_label}.")
+                target_account = next(
+                    (a for a in accounts if a.get("preferred")), accounts[0]
+                )
 
             # 3. Set Context
             service_obj.account_id = target_account["accountId"]
             service_obj.account_type = target_account["accountType"]
 
             logger.info(
-                f"Authenticated {env_label} Service: {service_obj.account_id} ({service_obj.account_type})"
+                "Authenticated %s Service: %s (%s)",
+                env_label,
+                service_obj.account_id,
+                service_obj.account_type,
             )
 
         except Exception as e:
-            logger.error(f"Authentication failed for {env_label}: {e}")
+            logger.error("Authentication failed for %s: %s", env_label, e)
             raise
 
+    def _ensure_auth(self):
+        if not self.authenticated:
+            self.authenticate()
+
     def authenticate(self):
         """
         Authenticates the trading service (and data service if separate).
         """
         try:
-            # 1. Authenticate Trading Service
-            self._authenticate_service(
-                self.service,
-                IG_USERNAME,
-                IG_PASSWORD,
-                IG_ACC_ID,
-                "LIVE TRADING" if IS_LIVE else "DEMO TRADING",
-            )
+            # 1. Trading Service
+            logins = [
+                (
+                    self.service,
+                    IG_USERNAME,
+                    IG_PASSWORD,
+                    IG_ACC_ID,
+                    "LIVE TRADING" if IS_LIVE else "DEMO TRADING",
+                )
+            ]
 
-            # 2. Authenticate Data Service (if separate)
+            # 2. Data Service (if separate)
             if self.data_service != self.service and self.live_data_config:
-                self._authenticate_service(
-                    self.data_service,
-                    self.live_data_config.get("IG_USERNAME"),
-                    self.live_data_config.get("IG_PASSWORD"),
-                    self.live_data_config.get("IG_ACC_ID"),
-                    "LIVE DATA",
+                logins.append(
+                    (
+                        self.data_service,
+                        self.live_data_config.get("IG_USERNAME"),
+                        self.live_data_config.get("IG_PASSWORD"),
+                        self.live_data_config.get("IG_ACC_ID"),
+                        "LIVE DATA",
+                    )
                 )
 
+            if len(logins) == 1:
+                self._authenticate_service(*logins[0])
+            else:
+                # Each service has its own requests.Session, so the logins are independent
+                with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=len(logins)
+                ) as executor:
+                    futures = [
+                        executor.submit(self._authenticate_service, *login)
+                        for login in logins
+                    ]
+                    for future in concurrent.futures.as_completed(futures):
+                        future.result()
+
             self.authenticated = True
         except Exception as e:
             self.authenticated = False
             raise e
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((IGException, ConnectionError)),
-    )
+    @ig_retry
     def fetch_historical_data(
         self, epic: str, resolution: str, num_points: int
     ) -> pd.DataFrame:
         """
         Fetches historical OHLC data. Uses data_service (Live or Demo).
         """
-        if not self.authenticated:
-            self.authenticate()
+        if num_points <= 0:
+            # Nothing to ask IG for; don't spend a request (or a login) on it
+            return pd.DataFrame(columns=list(HIST_COLUMN_RENAMES.values()))
+
+        self._ensure_auth()
 
         try:
             # Use data_service here
@@ -198,22 +411,50 @@ class IGClient:
             df = response["prices"]
             return self._process_historical_df(df)
         except Exception as e:
-            logger.error(f"Error fetching data for {epic}: {e}")
+            logger.error("Error fetching data for %s: %s", epic, e)
             raise
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((IGException, ConnectionError)),
-    )
+    def fetch_historical_data_many(
+        self, epics: List[str], resolution: str, num_points: int
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Fetches the same resolution/points for several epics concurrently.
+        Raises the first failure, like calling fetch_historical_data in a loop.
+        """
+        # Log in once up front rather than racing authenticate() across workers
+        self._ensure_auth()
+
+        if len(epics) <= 1:
+            return {
+                epic: self.fetch_historical_data(epic, resolution, num_points)
+                for epic in epics
+            }
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(HIST_FETCH_WORKERS, len(epics))
+        ) as executor:
+            futures = {
+                epic: executor.submit(
+                    self.fetch_historical_data, epic, resolution, num_points
+                )
+                for epic in epics
+            }
+            return {epic: future.result() for epic, future in futures.items()}
+
+    @ig_retry
     def fetch_historical_data_by_range(
         self, epic: str, resolution: str, start_date: str, end_date: str
     ) -> pd.DataFrame:
         """
         Fetches historical OHLC data by range. Uses data_service (Live or Demo).
         """
-        if not self.authenticated:
-            self.authenticate()
+        cache_entry = self._hist_cache_entry(epic, resolution, start_date, end_date)
+        if cache_entry is not None:
+            df = self._load_hist_cache(epic, *cache_entry)
+            if df is not None:
+                return df
+
+        self._ensure_auth()
 
         try:
             # Use data_service here
@@ -221,43 +462,127 @@ class IGClient:
                 epic, resolution, start_date, end_date
             )
             df = response["prices"]
-            return self._process_historical_df(df)
+            df = self._process_historical_df(df)
         except Exception as e:
-            logger.error(f"Error fetching historical range for {epic}: {e}")
+            logger.error("Error fetching historical range for %s: %s", epic, e)
             raise
 
+        # Empty windows (weekends, holidays) are cached too, briefly, so they
+        # aren't re-queried on every run
+        if cache_entry is not None:
+            cache_path = cache_entry[0]
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(cache_path, "wb") as f:
+                    pickle.dump(df, f)
+            except Exception as e:
+                logger.warning("Failed to save history cache for %s: %s", epic, e)
+        return df
+
+    def _hist_cache_entry(
+        self, epic: str, resolution: str, start_date: str, end_date: str
+    ) -> Optional[Tuple[Path, float]]:
+        """
+        Returns the cache file for a historical range and how long it stays
+        fresh: HIST_CACHE_TTL_SECONDS once its bars have settled, one bar
+        length while the range is still forming. None if the dates don't parse.
+        """
+        try:
+            # As a plain timedelta: datetime minus a second-unit pd.Timedelta
+            # (what to_offset yields) silently subtracts nothing
+            bar_length = pd.Timedelta(
+                pd.tseries.frequencies.to_offset(resolution)
+            ).to_pytimedelta()
+            end = datetime.fromisoformat(end_date)
+        except (ValueError, TypeError):
+            return None
+        if end > datetime.now() - HIST_CACHE_SETTLE_BARS * bar_length:
+            ttl = bar_length.total_seconds()
+        else:
+            ttl = HIST_CACHE_TTL_SECONDS
+
+        raw_key = f"{self._data_source()}|{epic}|{resolution}|{start_date}|{end_date}"
+        path = HIST_CACHE_DIR / f"{hashlib.sha1(raw_key.encode()).hexdigest()}.pkl"
+        return path, ttl
+
+    @staticmethod
+    def _load_hist_cache(epic: str, path: Path, ttl: float) -> Optional[pd.DataFrame]:
+        """
+        Loads a cached historical range if it is still fresh, dropping it once
+        expired. Empty results expire after HIST_EMPTY_CACHE_TTL_SECONDS.
+        """
+        try:
+            age = time.time() - path.stat().st_mtime
+            if age <= ttl:
+                with open(path, "rb") as f:
+                    df = pickle.load(f)
+                if not df.empty or age <= HIST_EMPTY_CACHE_TTL_SECONDS:
+                    logger.debug("Loaded %s history from cache.", epic)
+                    return df
+            path.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Failed to load history cache for %s: %s", epic, e)
+        return None
+
+    def _data_source(self) -> str:
+        """
+        Identifies the environment and account serving historical data, so
+        cached prices from demo and live (.env.live) feeds never mix.
+        """
+        if self.live_data_config is not None:
+            return f"LIVE:{self.live_data_config.get('IG_ACC_ID')}"
+        return f"{'LIVE' if IS_LIVE else 'DEMO'}:{IG_ACC_ID}"
+
     def _process_historical_df(self, df: pd.DataFrame) -> pd.DataFrame:
         if isinstance(df.columns, pd.MultiIndex):
+            top = set(df.columns.get_level_values(0))
+
             # Extract volume if it exists at the top level
             volume_col = None
-            if "Volume" in df.columns.get_level_values(0):
-                volume_col = df["Volume"]
+            if "Volume" in top:
+                volume_col = df.xs("Volume", axis=1, level=0).iloc[:, 0]
 
-            if "bid" in df.columns.get_level_values(0):
-                df = df["bid"]
-            elif "last" in df.columns.get_level_values(0):
-                df = df["last"]
-            elif "ask" in df.columns.get_level_values(0):
-                df = df["ask"]
+            for side in ("bid", "last", "ask"):
+                if side in top:
+                    df = df.xs(side, axis=1, level=0)
+                    break
 
             # Re-attach volume if we extracted it
             if volume_col is not None:
-                # If volume_col is a DataFrame (e.g. from multi-index), take its first column
-                if isinstance(volume_col, pd.DataFrame):
-                    df["volume"] = volume_col.iloc[:, 0]
-                else:
-                    df["volume"] = volume_col
-
-        df.rename(
-            columns={
-                "Open": "open",
-                "High": "high",
-                "Low": "low",
-                "Close": "close",
-                "Volume": "volume",
-            },
-            inplace=True,
-        )
+                df = df.assign(volume=volume_col.to_numpy())
+
+        df = df.rename(columns=HIST_COLUMN_RENAMES, copy=False)
+        return self._downcast_ohlcv(df)
+
+    @staticmethod
+    def _downcast_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Shrinks OHLC columns to float32 and volume to int32 where that is lossless.
+        pandas' own float downcast accepts values that are merely close
+        (7505.3 -> 7505.2998...), so prices are only shrunk when every value
+        survives the float64 -> float32 -> float64 round trip exactly.
+        """
+        for col in ("open", "high", "low", "close"):
+            if col in df.columns:
+                try:
+                    prices = pd.to_numeric(df[col])
+                except (ValueError, TypeError):
+                    continue
+                narrowed = prices.astype("float32")
+                exact = (narrowed.astype("float64") == prices) | prices.isna()
+                df[col] = narrowed if exact.all() else prices
+
+        if "volume" in df.columns:
+            try:
+                volume = pd.to_numeric(df["volume"], downcast="integer")
+                # Keep headroom for arithmetic (sums/diffs) on small volume dtypes
+                if volume.dtype.kind == "i" and volume.dtype.itemsize < 4:
+                    volume = volume.astype("int32")
+                df["volume"] = volume
+            except (ValueError, TypeError):
+                pass
         return df
 
     def place_spread_bet_order(
@@ -273,135 +598,174 @@ class IGClient:
         Places a SPREAD BET order using self.service (TRADING service).
         Refactored to use the trading_ig library's create_open_position method.
         """
-        if not self.authenticated:
-            self.authenticate()
+        self._ensure_auth()
 
         if size <= 0:
             raise ValueError("Size must be positive.")
 
-        currency_code = "GBP"
-
         try:
             logger.info(
-                f"Placing Spread Bet: Epic={epic}, Dir={direction}, Size={size}, Stop={stop_level}, Limit={limit_level}"
+                "Placing Spread Bet: Epic=%s, Dir=%s, Size=%s, Stop=%s, Limit=%s",
+                epic,
+                direction,
+                size,
+                stop_level,
+                limit_level,
             )
 
             # Use self.service.create_open_position
             response = self.service.create_open_position(
-                currency_code=currency_code,
+                **MARKET_SPREAD_BET_ORDER,
                 direction=direction,
                 epic=epic,
-                expiry="DFB",  # DFB for Daily Funded Bet (Spread Bet)
-                force_open=True,
-                guaranteed_stop=False,
-                level=None,  # MARKET orders execute at current price, level must be None
                 limit_level=limit_level,
-                limit_distance=None,
-                order_type="MARKET",
-                quote_id=None,
                 size=size,
-                stop_distance=None,
                 stop_level=stop_level,
-                trailing_stop=False,  # Trailing stop is managed manually in TradeMonitorDB
-                trailing_stop_increment=None,
             )
+            self._invalidate_positions_cache()
 
             if "dealReference" in response:
                 deal_ref = response["dealReference"]
-                logger.info(f"Order Submitted. Deal Ref: {deal_ref}")
+                logger.info("Order Submitted. Deal Ref: %s", deal_ref)
 
-                confirmation = self.service.fetch_deal_by_deal_reference(deal_ref)
+                confirmation = self._confirm_deal(deal_ref)
 
-                if confirmation["dealStatus"] == "ACCEPTED":
-                    logger.info(f"Market Order ACCEPTED: {deal_ref}")
+                if confirmation.get("dealStatus") == "ACCEPTED":
+                    logger.info("Market Order ACCEPTED: %s", deal_ref)
+                    # Another thread may have cached a snapshot without the new
+                    # deal while the confirmation was polled
+                    self._invalidate_positions_cache()
                     return confirmation
                 else:
-                    logger.error(f"Market Order REJECTED Full Details: {confirmation}")
+                    logger.error("Market Order REJECTED Full Details: %s", confirmation)
                     reason = confirmation.get("reason", "Unknown")
                     raise Exception(f"Order rejected: {reason}")
             else:
                 # Should not happen with successful library call, but handling just in case
                 logger.error(
-                    f"Unexpected response format from create_open_position: {response}"
+                    "Unexpected response format from create_open_position: %s",
+                    response,
                 )
                 raise Exception(f"API Error: Unexpected response {response}")
 
         except Exception as e:
-            logger.error(f"Order placement failed: {e}")
+            logger.error("Order placement failed: %s", e)
             raise
 
+    def _confirm_deal(self, deal_ref: str) -> dict:
+        """
+        Fetches the deal confirmation, briefly re-polling while IG hasn't settled
+        it yet, so a slow confirm isn't mistaken for a rejected order.
+        """
+        confirmation = self.service.fetch_deal_by_deal_reference(deal_ref)
+        for delay in CONFIRM_POLL_DELAYS:
+            if confirmation.get("dealStatus") in TERMINAL_DEAL_STATUSES:
+                break
+            time.sleep(delay)
+            confirmation = self.service.fetch_deal_by_deal_reference(deal_ref)
+        return confirmation
+
     def update_open_position(
         self, deal_id: str, stop_level: float = None, limit_level: float = None
     ):
-        if not self.authenticated:
-            self.authenticate()
+        self._ensure_auth()
 
         try:
             # Use self.service
             response = self.service.update_open_position(
                 deal_id=deal_id, stop_level=stop_level, limit_level=limit_level
             )
+            self._invalidate_positions_cache()
             logger.info(
-                f"Updated position {deal_id}: Stop={stop_level}, Limit={limit_level}. Response: {response}"
+                "Updated position %s: Stop=%s, Limit=%s. Response: %s",
+                deal_id,
+                stop_level,
+                limit_level,
+                response,
             )
             return response
 
         except Exception as e:
-            logger.error(f"Failed to update position {deal_id}: {e}")
+            logger.error("Failed to update position %s: %s", deal_id, e)
             raise
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((IGException, ConnectionError)),
-    )
+    @ig_retry
     def fetch_open_position_by_deal_id(self, deal_id: str):
-        if not self.authenticated:
-            self.authenticate()
+        self._ensure_auth()
 
         try:
-            # Use self.service
-            positions = self.service.fetch_open_positions()
-
-            if isinstance(positions, pd.DataFrame):
-                if positions.empty:
-                    return None
-                if "dealId" in positions.columns:
-                    row = positions[positions["dealId"] == deal_id]
-                    if not row.empty:
-                        return row.iloc[0].to_dict()
-
-            elif isinstance(positions, dict):
-                if "positions" in positions:
-                    for pos in positions["positions"]:
-                        if pos.get("position", {}).get("dealId") == deal_id:
-                            return pos
-            return None
+            cache = self._positions_cache
+            if cache is None or (
+                time.monotonic() - cache[0] > POSITIONS_CACHE_TTL_SECONDS
+            ):
+                # Use self.service
+                positions = self.service.fetch_open_positions()
+                cache = (time.monotonic(), self._index_positions(positions))
+                self._positions_cache = cache
+            return cache[1].get(deal_id)
         except Exception as e:
-            logger.error(f"Error fetching position {deal_id}: {e}")
+            logger.error("Error fetching position %s: %s", deal_id, e)
             return None
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((IGException, ConnectionError)),
-    )
+    @staticmethod
+    def _index_positions(positions) -> dict:
+        """
+        Builds a {dealId: position} lookup from either response shape of
+        fetch_open_positions (DataFrame rows, or the raw 'positions' list).
+        """
+        if isinstance(positions, pd.DataFrame):
+            if positions.empty or "dealId" not in positions.columns:
+                return {}
+            index = {}
+            for row in positions.to_dict("records"):
+                # Keep the first row per deal, as the column filter did
+                index.setdefault(row["dealId"], row)
+            return index
+
+        if isinstance(positions, dict):
+            index = {}
+            for pos in positions.get("positions", []):
+                deal_id = pos.get("position", {}).get("dealId")
+                if deal_id is not None:
+                    index.setdefault(deal_id, pos)
+            return index
+        return {}
+
+    def _invalidate_positions_cache(self):
+        self._positions_cache = None
+
+    @ig_retry
     def get_market_info(self, epic: str):
         """
         Fetches details about a market (min stop distance, etc).
         Using trading service to ensure consistency with trading rules.
         """
-        if not self.authenticated:
-            self.authenticate()
+        cached = self._market_cache.get(epic)
+        if cached is not None and (
+            time.monotonic() - cached[0] <= MARKET_INFO_CACHE_TTL_SECONDS
+        ):
+            return cached[1]
+
+        self._ensure_auth()
 
-        return self.service.fetch_market_by_epic(epic)
+        market_info = self.service.fetch_market_by_epic(epic)
+        self._market_cache[epic] = (time.monotonic(), market_info)
+        return market_info
+
+    def invalidate_market_info(self, epic: Optional[str] = None):
+        """
+        Drops cached market info for one epic, or for every epic if none is given.
+        """
+        if epic is None:
+            self._market_cache.clear()
+        else:
+            self._market_cache.pop(epic, None)
 
     def get_account_info(self):
         """
         Fetches account details for the TRADING account.
         """
-        if not self.authenticated:
-            self.authenticate()
+        self._ensure_auth()
 
         return self.service.fetch_accounts()
 
@@ -415,10 +779,9 @@ class IGClient:
     ):
         """
         Closes an open position by placing an opposing market order.
-        In IG API, deal_id and (epic, expiry) are often mutually exclusive for closure.
+        deal_id takes precedence; (epic, expiry) is only sent when there is no deal_id.
         """
-        if not self.authenticated:
-            self.authenticate()
+        self._ensure_auth()
 
         if not deal_id and not epic:
             raise ValueError(
@@ -427,38 +790,39 @@ class IGClient:
 
         try:
             logger.info(
-                f"Attempting to CLOSE position: DealID={deal_id}, Epic={epic}, Dir={direction}, Size={size}"
+                "Attempting to CLOSE position: DealID=%s, Epic=%s, Dir=%s, Size=%s",
+                deal_id,
+                epic,
+                direction,
+                size,
             )
+            # IG wants either dealId or epic+expiry, never both
+            if deal_id:
+                target = {"deal_id": deal_id, "epic": None, "expiry": None}
+            else:
+                target = {"deal_id": None, "epic": epic, "expiry": expiry}
             response = self.service.close_open_position(
-                deal_id=deal_id,
+                **MARKET_CLOSE_ORDER,
+                **target,
                 direction=direction,
-                epic=epic,
-                expiry=expiry,
-                level=None,
-                order_type="MARKET",
-                quote_id=None,
                 size=size,
             )
-            logger.info(f"Close Position Response: {response}")
+            self._invalidate_positions_cache()
+            logger.info("Close Position Response: %s", response)
             return response
         except Exception as e:
-            logger.error(f"Failed to close position: {e}")
+            logger.error("Failed to close position: %s", e)
             raise
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((IGException, ConnectionError)),
-    )
+    @ig_retry
     def fetch_transaction_history_by_deal_id(self, deal_id: str):
         """
         Fetches transaction history for the TRADING account.
         """
-        if not self.authenticated:
-            self.authenticate()
+        self._ensure_auth()
 
         try:
             return self.service.fetch_transaction_history()
         except Exception as e:
-            logger.error(f"Error fetching transaction history: {e}")
+            logger.error("Error fetching transaction history: %s", e)
             return None
@@ -179,7 +179,6 @@ class OpportunityAnalyzer:
             )
 
             trades = [dict(row) for row in cursor.fetchall()]
-            conn.close()
 
             bot_status = "NO_ACTION"
             trade_details = None
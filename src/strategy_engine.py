@@ -55,8 +55,15 @@ class StrategyEngine:
         self.min_size = min_size
         self.model_name = model_name
 
+        # Dry runs on cached market data replay cached data and Gemini responses
+        use_cache = self.dry_run and not self.live_data
+
         self.client = ig_client if ig_client else IGClient()
-        self.analyst = analyst if analyst else GeminiAnalyst(model_name=self.model_name)
+        self.analyst = (
+            analyst
+            if analyst
+            else GeminiAnalyst(model_name=self.model_name, use_cache=use_cache)
+        )
         self.news_fetcher = news_fetcher if news_fetcher else NewsFetcher()
         self.market_status = market_status if market_status else MarketStatus()
         self.trade_logger = trade_logger if trade_logger else TradeLoggerDB()
@@ -72,7 +79,6 @@ class StrategyEngine:
         )
 
         # Initialize Data Provider
-        use_cache = self.dry_run and not self.live_data
         self.data_provider = MarketDataProvider(
             self.client, self.news_fetcher, use_cache=use_cache
         )
@@ -1,7 +1,7 @@
 import logging
 from datetime import datetime
 from src.gemini_analyst import TradingSignal, Action
-from src.database import get_db_connection, init_db
+from src.database import DB_LOCK, get_db_connection, init_db
 
 logger = logging.getLogger(__name__)
 
@@ -28,42 +28,42 @@ class TradeLoggerDB:
 
         try:
             conn = get_db_connection(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute(
-                """
-                INSERT INTO trade_log (
-                    timestamp, epic, action, entry_type, entry, stop_loss, initial_stop_loss, take_profit,
-                    size, outcome, reasoning, confidence, spread_at_entry,
-                    atr, is_dry_run, deal_id, use_trailing_stop
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    timestamp,
-                    epic,
-                    plan.action.value
-                    if isinstance(plan.action, Action)
-                    else str(plan.action),
-                    entry_type,
-                    plan.entry,
-                    plan.stop_loss,
-                    plan.stop_loss,  # initial_stop_loss
-                    plan.take_profit,
-                    plan.size,
-                    outcome,
-                    plan.reasoning,
-                    plan.confidence,
-                    spread_at_entry,
-                    plan.atr,
-                    is_dry_run,
-                    deal_id,
-                    plan.use_trailing_stop,
-                ),
-            )
-
-            conn.commit()
-            row_id = cursor.lastrowid  # Get the ID of the inserted row
-            conn.close()
+            # The connection context rolls back a failed insert so the shared
+            # connection isn't left with an open transaction
+            with DB_LOCK, conn:
+                cursor = conn.cursor()
+
+                cursor.execute(
+                    """
+                    INSERT INTO trade_log (
+                        timestamp, epic, action, entry_type, entry, stop_loss, initial_stop_loss, take_profit,
+                        size, outcome, reasoning, confidence, spread_at_entry,
+                        atr, is_dry_run, deal_id, use_trailing_stop
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                    (
+                        timestamp,
+                        epic,
+                        plan.action.value
+                        if isinstance(plan.action, Action)
+                        else str(plan.action),
+                        entry_type,
+                        plan.entry,
+                        plan.stop_loss,
+                        plan.stop_loss,  # initial_stop_loss
+                        plan.take_profit,
+                        plan.size,
+                        outcome,
+                        plan.reasoning,
+                        plan.confidence,
+                        spread_at_entry,
+                        plan.atr,
+                        is_dry_run,
+                        deal_id,
+                        plan.use_trailing_stop,
+                    ),
+                )
+                row_id = cursor.lastrowid  # Get the ID of the inserted row
             logger.info(
                 f"Logged trade for {epic} with outcome: {outcome} (Deal ID: {deal_id}, Row ID: {row_id})"
             )
@@ -88,7 +88,6 @@ class TradeLoggerDB:
         """
         try:
             conn = get_db_connection(self.db_path)
-            cursor = conn.cursor()
 
             updates = ["outcome = ?"]
             params = [outcome]
@@ -112,10 +111,8 @@ class TradeLoggerDB:
             params.append(row_id)
             query = f"UPDATE trade_log SET {', '.join(updates)} WHERE id = ?"
 
-            cursor.execute(query, params)
-
-            conn.commit()
-            conn.close()
+            with DB_LOCK, conn:
+                conn.execute(query, params)
             logger.info(
                 f"Updated trade outcome for Row ID {row_id} to: {outcome} (Deal ID: {deal_id}, Size: {size}, Entry: {entry}, SL: {stop_loss})"
             )
@@ -146,6 +146,11 @@ class MockGeminiAnalyst:
             )
         )
         self.generate_post_mortem = MagicMock(return_value="Mock Post-Mortem Report")
+        self.stream_post_mortem = MagicMock(
+            side_effect=lambda *args, **kwargs: iter(["Mock Post-Mortem Report"])
+        )
+        self.last_post_mortem_complete = True
+        self.last_post_mortem_truncated = False
 
 
 class MockStreamManager:
@@ -2,8 +2,14 @@ import unittest
 import os
 import sqlite3
 from src.database import (
+    close_db,
+    delete_trade_log,
+    finalize_trade,
+    get_db_connection,
+    get_read_only_connection,
     init_db,
     fetch_recent_trades,
+    log_trades_bulk,
     fetch_trade_data,
     save_post_mortem,
 )
@@ -20,6 +26,7 @@ class TestDatabase(unittest.TestCase):
 
     def tearDown(self):
         # Cleanup
+        close_db(self.test_db_path)
         if os.path.exists(self.test_db_path):
             os.remove(self.test_db_path)
 
@@ -81,6 +88,10 @@ class TestDatabase(unittest.TestCase):
             self.assertEqual(len(trades), 2)
             self.assertEqual(trades[0]["epic"], "C")  # Most recent first
             self.assertEqual(trades[1]["epic"], "B")
+            self.assertNotIn("post_mortem", trades[0])  # Summary columns only
+
+            with self.assertRaises(ValueError):
+                fetch_recent_trades(limit=1, columns=["epic; DROP TABLE trade_log"])
 
         finally:
             src.database.DB_PATH = original_db_path
@@ -125,6 +136,86 @@ class TestDatabase(unittest.TestCase):
         finally:
             src.database.DB_PATH = original_db_path
 
+    def test_finalize_trade_writes_outcome_and_post_mortem(self):
+        init_db(self.test_db_path)
+        conn = sqlite3.connect(self.test_db_path)
+        conn.execute("INSERT INTO trade_log (deal_id, epic) VALUES ('D1', 'A')")
+        conn.commit()
+        conn.close()
+
+        finalize_trade(
+            "D1", 105.0, 50.0, "2023-01-01T12:00:00", "WIN", "Report", self.test_db_path
+        )
+
+        conn = sqlite3.connect(self.test_db_path)
+        row = conn.execute(
+            "SELECT exit_price, pnl, outcome, post_mortem FROM trade_log WHERE deal_id = 'D1'"
+        ).fetchone()
+        conn.close()
+        self.assertEqual(row, (105.0, 50.0, "WIN", "Report"))
+
+    def test_log_trades_bulk(self):
+        init_db(self.test_db_path)
+        trades = [
+            {"timestamp": "2023-01-01T10:00:00", "epic": "A", "deal_id": "B1"},
+            {"timestamp": "2023-01-01T11:00:00", "epic": "B", "deal_id": "B2"},
+        ]
+
+        inserted = log_trades_bulk(trades, db_path=self.test_db_path)
+
+        self.assertEqual(inserted, 2)
+        recent = fetch_recent_trades(limit=5, db_path=self.test_db_path)
+        self.assertEqual([t["deal_id"] for t in recent], ["B2", "B1"])
+
+    def test_init_db_records_schema_version(self):
+        import src.database
+
+        init_db(self.test_db_path)
+        init_db(self.test_db_path)  # Second call is a no-op
+
+        conn = sqlite3.connect(self.test_db_path)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.close()
+        self.assertEqual(version, src.database.SCHEMA_VERSION)
+
+    def test_init_db_failed_migration_leaves_version_unstamped(self):
+        os.makedirs(os.path.dirname(self.test_db_path), exist_ok=True)
+        conn = sqlite3.connect(self.test_db_path)
+        # A view can't be altered, so the first migration fails
+        conn.execute("CREATE VIEW trade_log AS SELECT 1 AS id")
+        conn.commit()
+        conn.close()
+
+        with self.assertRaises(sqlite3.OperationalError):
+            init_db(self.test_db_path)
+
+        conn = sqlite3.connect(self.test_db_path)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.close()
+        self.assertEqual(version, 0)
+
+    def test_delete_missing_trade_leaves_no_open_transaction(self):
+        init_db(self.test_db_path)
+
+        self.assertFalse(delete_trade_log("MISSING", db_path=self.test_db_path))
+
+        conn = get_db_connection(self.test_db_path)
+        self.assertFalse(conn.in_transaction)
+
+    def test_connection_is_shared_until_closed(self):
+        conn = get_db_connection(self.test_db_path)
+        self.assertIs(get_db_connection(self.test_db_path), conn)
+
+        close_db(self.test_db_path)
+        self.assertIsNot(get_db_connection(self.test_db_path), conn)
+
+    def test_read_only_connection_rejects_writes(self):
+        init_db(self.test_db_path)
+        conn = get_read_only_connection(self.test_db_path)
+
+        with self.assertRaises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO trade_log (epic) VALUES ('A')")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -7,7 +7,7 @@ from src.strategy_engine import StrategyEngine
 from src.gemini_analyst import Action, TradingSignal, EntryType
 from src.trade_logger_db import TradeLoggerDB
 from src.trade_monitor_db import TradeMonitorDB
-from src.database import init_db
+from src.database import close_db, init_db
 
 # Use a separate temp DB for this test to avoid clashing with other tests or dev data
 TEST_DB_PATH = "tests/test_lifecycle.db"
@@ -19,6 +19,7 @@ def lifecycle_db():
         os.remove(TEST_DB_PATH)
     init_db(TEST_DB_PATH)
     yield TEST_DB_PATH
+    close_db(TEST_DB_PATH)
     if os.path.exists(TEST_DB_PATH):
         os.remove(TEST_DB_PATH)
 
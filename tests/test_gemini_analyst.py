@@ -1,8 +1,20 @@
+import concurrent.futures
 import pytest
-from unittest.mock import MagicMock, patch
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+import hashlib
 import json
-from src.gemini_analyst import GeminiAnalyst, TradingSignal, Action, EntryType
-from google.genai import types
+import pandas as pd
+from src import gemini_analyst
+from src.gemini_analyst import (
+    ANALYST_SYSTEM_INSTRUCTION,
+    GeminiAnalyst,
+    TradingSignal,
+    Action,
+    EntryType,
+)
+from google.genai import errors, types
 
 
 # Mock response class to simulate Gemini's return object
@@ -30,8 +42,13 @@ class MockGeminiResponse:
 
 @pytest.fixture
 def mock_genai():
+    # Clients and context caches are shared module-wide; start each test without one
+    gemini_analyst._CLIENTS.clear()
+    gemini_analyst._CONTEXT_CACHES.clear()
     with patch("src.gemini_analyst.genai") as mock:
         yield mock
+    gemini_analyst._CLIENTS.clear()
+    gemini_analyst._CONTEXT_CACHES.clear()
 
 
 def test_analyze_market_success(mock_genai):
@@ -179,3 +196,621 @@ def test_analyze_market_optional_tp(mock_genai):
     assert result.action == Action.BUY
     assert result.take_profit is None
     assert result.use_trailing_stop is True
+
+
+def test_generate_post_mortem_summarises_monitor_and_history(mock_genai):
+    # Setup
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    mock_client.models.generate_content.return_value = MockGeminiResponse(
+        "Post-Mortem Report"
+    )
+
+    monitor = [
+        {"bid": 100.0, "pnl": -3.0},
+        {"bid": 104.0, "pnl": 7.0},
+        {"bid": 102.0, "pnl": 2.0},
+    ]
+    index = pd.date_range("2024-01-01 10:00", periods=10, freq="1min").astype(str)
+    price_history_df = pd.DataFrame(
+        {
+            "open": ["100"] * 10,
+            "high": [105.0] * 10,
+            "low": [95.0] * 10,
+            "close": [101.0] * 10,
+        },
+        index=index,
+    )
+
+    # Execute
+    analyst = GeminiAnalyst()
+    report = analyst.generate_post_mortem(
+        {"log": {"entry": 100.0}, "monitor": monitor}, price_history_df
+    )
+
+    # Verify
+    assert report == "Post-Mortem Report"
+    prompt = mock_client.models.generate_content.call_args.kwargs["contents"]
+    assert "PnL Range: -3.0 to 7.0" in prompt
+    assert "Period High: 105.0" in prompt
+    assert "Could not process price history" not in prompt
+    assert "Candle Data (Last 10 bars, CSV)" in prompt
+    assert "105.0000" in prompt
+    assert "Monitoring Data Sample (All)" in prompt
+    assert "bid=100.0,pnl=-3.0\nbid=104.0,pnl=7.0" in prompt
+    # Static instructions are sent as the system instruction, not in the prompt
+    assert "Analysis Required" not in prompt
+    config = mock_client.models.generate_content.call_args.kwargs["config"]
+    assert "senior trading risk manager" in config.system_instruction
+
+    # Caller's frame is left as it was passed in
+    assert price_history_df["open"].dtype == object
+    assert not isinstance(price_history_df.index, pd.DatetimeIndex)
+
+
+def test_analyze_market_uses_context_cache(mock_genai):
+    # Setup
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    mock_client.models.count_tokens.return_value.total_tokens = 5000
+    mock_client.caches.create.return_value.name = "cachedContents/abc123"
+    mock_client.models.generate_content.return_value = MockGeminiResponse(
+        json.dumps(
+            {
+                "ticker": "FTSE100",
+                "action": "WAIT",
+                "entry": 0.0,
+                "stop_loss": 0.0,
+                "take_profit": None,
+                "size": 0.0,
+                "atr": 0.0,
+                "confidence": "low",
+                "reasoning": "No setup.",
+            }
+        )
+    )
+
+    # Execute
+    analyst = GeminiAnalyst()
+    analyst.analyze_market("Context one")
+    analyst.analyze_market("Context two")
+
+    # A second analyst reuses the cache instead of creating another
+    GeminiAnalyst().analyze_market("Context three")
+
+    # Verify: cache is created once and referenced instead of the inline instruction
+    mock_client.caches.create.assert_called_once()
+    config = mock_client.models.generate_content.call_args.kwargs["config"]
+    assert config.cached_content == "cachedContents/abc123"
+    assert config.system_instruction is None
+    assert config.response_schema is not None
+
+
+WAIT_SIGNAL_JSON = json.dumps(
+    {
+        "ticker": "FTSE100",
+        "action": "WAIT",
+        "entry": 0.0,
+        "stop_loss": 0.0,
+        "take_profit": None,
+        "size": 0.0,
+        "atr": 0.0,
+        "confidence": "low",
+        "reasoning": "No setup.",
+    }
+)
+
+
+def test_analyze_market_skips_context_cache_below_minimum(mock_genai):
+    # Setup: the instruction is too small for an explicit cache
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    mock_client.models.count_tokens.return_value.total_tokens = 850
+    mock_client.models.generate_content.return_value = MockGeminiResponse(
+        WAIT_SIGNAL_JSON
+    )
+
+    # Execute
+    analyst = GeminiAnalyst()
+    analyst.analyze_market("Context one")
+    analyst.analyze_market("Context two")
+
+    # Verify: counted once, never created, instruction sent inline
+    mock_client.models.count_tokens.assert_called_once()
+    mock_client.caches.create.assert_not_called()
+    config = mock_client.models.generate_content.call_args.kwargs["config"]
+    assert config.system_instruction == ANALYST_SYSTEM_INSTRUCTION
+
+
+def test_analyze_market_retries_context_cache_after_transient_failure(mock_genai):
+    # Setup: the first create is throttled, the second succeeds
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    mock_client.models.count_tokens.return_value.total_tokens = 5000
+    created = MagicMock()
+    created.name = "cachedContents/abc123"
+    mock_client.caches.create.side_effect = [
+        errors.ClientError(429, {"error": {"status": "RESOURCE_EXHAUSTED"}}),
+        created,
+    ]
+    mock_client.models.generate_content.return_value = MockGeminiResponse(
+        WAIT_SIGNAL_JSON
+    )
+
+    # Execute
+    analyst = GeminiAnalyst()
+    analyst.analyze_market("Context one")
+    # The failure is recorded, so another analyst doesn't retry it yet
+    GeminiAnalyst().analyze_market("Context two")
+    inline_config = mock_client.models.generate_content.call_args.kwargs["config"]
+    assert mock_client.caches.create.call_count == 1
+
+    # Once the recorded failure expires, the next call creates the cache
+    key, (future, _) = next(iter(gemini_analyst._CONTEXT_CACHES.items()))
+    gemini_analyst._CONTEXT_CACHES[key] = (future, 0)
+    analyst.analyze_market("Context three")
+
+    # Verify: throttled requests went inline, the next one used the cache
+    assert inline_config.system_instruction == ANALYST_SYSTEM_INSTRUCTION
+    config = mock_client.models.generate_content.call_args.kwargs["config"]
+    assert config.cached_content == "cachedContents/abc123"
+
+
+def test_context_cache_is_created_once_for_concurrent_analysts(mock_genai):
+    # Setup: creation is slow enough for the other analysts to miss too
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    mock_client.models.count_tokens.return_value.total_tokens = 5000
+    release = threading.Event()
+
+    def slow_create(**kwargs):
+        release.wait(timeout=5)
+        created = MagicMock()
+        created.name = "cachedContents/abc123"
+        return created
+
+    mock_client.caches.create.side_effect = slow_create
+    analysts = [GeminiAnalyst() for _ in range(4)]
+
+    # Execute
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(a._get_context_cache_name) for a in analysts]
+        # The lock isn't held during creation, so lookups still get through
+        time.sleep(0.05)
+        with gemini_analyst._CONTEXT_CACHES_LOCK:
+            pass
+        release.set()
+        names = [f.result() for f in futures]
+
+    # Verify
+    assert names == ["cachedContents/abc123"] * 4
+    mock_client.caches.create.assert_called_once()
+
+
+def test_interrupted_context_cache_creation_releases_waiters(mock_genai):
+    # Setup: creation is interrupted by a BaseException
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    mock_client.models.count_tokens.return_value.total_tokens = 5000
+    mock_client.caches.create.side_effect = KeyboardInterrupt
+    analyst = GeminiAnalyst()
+
+    # Execute
+    with pytest.raises(KeyboardInterrupt):
+        analyst._get_context_cache_name()
+
+    # Verify: the attempt is forgotten, so the next caller retries
+    assert gemini_analyst._CONTEXT_CACHES == {}
+
+
+def test_context_cache_waiters_time_out_to_inline_instruction(mock_genai):
+    # Setup: another analyst's creation never finishes
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    mock_client.models.generate_content.return_value = MockGeminiResponse(
+        WAIT_SIGNAL_JSON
+    )
+    analyst = GeminiAnalyst()
+    gemini_analyst._CONTEXT_CACHES[analyst._context_cache_key] = (
+        concurrent.futures.Future(),
+        float("inf"),
+    )
+
+    # Execute
+    with patch("src.gemini_analyst.CONTEXT_CACHE_WAIT_SECONDS", 0.01):
+        analyst.analyze_market("Context")
+
+    # Verify
+    config = mock_client.models.generate_content.call_args.kwargs["config"]
+    assert config.system_instruction == ANALYST_SYSTEM_INSTRUCTION
+    mock_client.caches.create.assert_not_called()
+
+
+def test_analyze_market_disables_context_cache_when_rejected_as_too_small(
+    mock_genai,
+):
+    # Setup: the count passes but Gemini rejects the cache as too small
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    mock_client.models.count_tokens.return_value.total_tokens = 5000
+    mock_client.caches.create.side_effect = errors.ClientError(
+        400, {"error": {"status": "INVALID_ARGUMENT", "message": "too small"}}
+    )
+    mock_client.models.generate_content.return_value = MockGeminiResponse(
+        WAIT_SIGNAL_JSON
+    )
+
+    # Execute
+    analyst = GeminiAnalyst()
+    analyst.analyze_market("Context one")
+    analyst.analyze_market("Context two")
+
+    # Verify: not retried
+    mock_client.caches.create.assert_called_once()
+
+
+def test_analyze_markets_runs_contexts_concurrently(mock_genai):
+    # Setup
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+
+    def make_response(ticker):
+        return MockGeminiResponse(
+            json.dumps(
+                {
+                    "ticker": ticker,
+                    "action": "WAIT",
+                    "entry": 0.0,
+                    "stop_loss": 0.0,
+                    "take_profit": None,
+                    "size": 0.0,
+                    "atr": 0.0,
+                    "confidence": "low",
+                    "reasoning": "No setup.",
+                }
+            )
+        )
+
+    mock_client.aio.models.generate_content = AsyncMock(
+        side_effect=[make_response("FTSE100"), Exception("boom")]
+    )
+
+    # Execute
+    analyst = GeminiAnalyst()
+    results = analyst.analyze_markets(
+        [("FTSE context", "London Open"), ("DAX context", "Germany Open")]
+    )
+
+    # Verify: order preserved, failure isolated to its own slot
+    assert results[0].ticker == "FTSE100"
+    assert results[1] is None
+    assert mock_client.aio.models.generate_content.await_count == 2
+    mock_client.models.generate_content.assert_not_called()
+
+
+def test_analyze_markets_batch_single_request(mock_genai):
+    # Setup
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+
+    signal = {
+        "action": "WAIT",
+        "entry": 0.0,
+        "stop_loss": 0.0,
+        "take_profit": None,
+        "size": 0.0,
+        "atr": 0.0,
+        "confidence": "low",
+        "reasoning": "No setup.",
+    }
+    mock_client.models.generate_content.return_value = MockGeminiResponse(
+        json.dumps([{**signal, "ticker": "FTSE100"}, {**signal, "ticker": "DAX"}])
+    )
+
+    # Execute
+    analyst = GeminiAnalyst()
+    results = analyst.analyze_markets_batch(
+        [("FTSE context", "London Open"), ("DAX context", "Germany Open")]
+    )
+
+    # Verify
+    assert [r.ticker for r in results] == ["FTSE100", "DAX"]
+    mock_client.models.generate_content.assert_called_once()
+    call_kwargs = mock_client.models.generate_content.call_args.kwargs
+    assert "=== Market 1: London Open ===\nFTSE context" in call_kwargs["contents"]
+    assert "=== Market 2: Germany Open ===\nDAX context" in call_kwargs["contents"]
+    assert call_kwargs["config"].response_schema["type"] == "array"
+
+
+def test_analyze_markets_batch_count_mismatch_returns_none(mock_genai):
+    # Setup
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    mock_client.models.generate_content.return_value = MockGeminiResponse("[]")
+
+    # Execute
+    analyst = GeminiAnalyst()
+    results = analyst.analyze_markets_batch([("A", "S1"), ("B", "S2")])
+
+    # Verify
+    assert results == [None, None]
+
+
+def test_analyze_market_malformed_json_returns_none(mock_genai):
+    # Setup
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    mock_client.models.generate_content.return_value = MockGeminiResponse(
+        '{"ticker": "FTSE100", "action": '
+    )
+
+    # Execute
+    analyst = GeminiAnalyst()
+    result = analyst.analyze_market("Context")
+
+    # Verify: malformed output is not retried
+    assert result is None
+    mock_client.models.generate_content.assert_called_once()
+
+
+def test_stream_post_mortem_yields_text_and_flags_truncation(mock_genai):
+    # Setup
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+
+    def make_chunk(text, thought=False, finish_reason=None):
+        part = MagicMock(thought=thought, text=text)
+        candidate = MagicMock(finish_reason=finish_reason, safety_ratings=None)
+        candidate.content.parts = [part]
+        chunk = MagicMock()
+        chunk.candidates = [candidate]
+        return chunk
+
+    mock_client.models.generate_content_stream.return_value = iter(
+        [
+            make_chunk("thinking...", thought=True),
+            make_chunk("- Plan followed. "),
+            make_chunk(
+                "- Stop too tight.", finish_reason=types.FinishReason.MAX_TOKENS
+            ),
+        ]
+    )
+
+    # Execute
+    analyst = GeminiAnalyst()
+    chunks = list(analyst.stream_post_mortem({"log": {"entry": 100.0}}))
+
+    # Verify: thoughts are not part of the report
+    assert "".join(chunks) == "- Plan followed. - Stop too tight.\n[TRUNCATED]"
+    mock_client.models.generate_content.assert_not_called()
+    assert analyst.last_post_mortem_complete is False
+    assert analyst.last_post_mortem_truncated is True
+
+
+def test_stream_post_mortem_reports_truncation_without_text(mock_genai):
+    # Setup: the token budget ran out while the model was still thinking
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    candidate = MagicMock(
+        finish_reason=types.FinishReason.MAX_TOKENS, safety_ratings=None
+    )
+    candidate.content.parts = [MagicMock(thought=True, text="thinking...")]
+    chunk = MagicMock()
+    chunk.candidates = [candidate]
+    mock_client.models.generate_content_stream.return_value = iter([chunk])
+
+    # Execute
+    analyst = GeminiAnalyst()
+    chunks = list(analyst.stream_post_mortem({"log": {"entry": 100.0}}))
+
+    # Verify: same message as generate_post_mortem
+    assert chunks == ["Analysis truncated before any text was returned."]
+    assert analyst.last_post_mortem_complete is False
+    assert analyst.last_post_mortem_truncated is False
+
+
+def test_stream_post_mortem_replays_cached_report(mock_genai, tmp_path):
+    # Setup
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    candidate = MagicMock(finish_reason=types.FinishReason.STOP, safety_ratings=None)
+    candidate.content.parts = [MagicMock(thought=False, text="- Plan followed.")]
+    chunk = MagicMock()
+    chunk.candidates = [candidate]
+    mock_client.models.generate_content_stream.return_value = iter([chunk])
+
+    cache_dir = tmp_path / "gemini"
+    analyst = GeminiAnalyst(use_cache=True)
+    analyst.cache_dir = str(cache_dir)
+    trade_data = {"log": {"entry": 100.0}}
+
+    # Execute
+    first = list(analyst.stream_post_mortem(trade_data))
+    second = list(analyst.stream_post_mortem(trade_data))
+
+    # Verify: the directory is created on first save, the rerun is replayed
+    assert cache_dir.is_dir()
+    assert "".join(first) == "".join(second) == "- Plan followed."
+    assert analyst.last_post_mortem_complete is True
+    mock_client.models.generate_content_stream.assert_called_once()
+
+
+def test_analyze_market_response_cache_replays_identical_requests(mock_genai, tmp_path):
+    # Setup
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    mock_client.models.generate_content.return_value = MockGeminiResponse(
+        json.dumps(
+            {
+                "ticker": "FTSE100",
+                "action": "WAIT",
+                "entry": 0.0,
+                "stop_loss": 0.0,
+                "take_profit": None,
+                "size": 0.0,
+                "atr": 0.0,
+                "confidence": "low",
+                "reasoning": "No setup.",
+            }
+        )
+    )
+
+    analyst = GeminiAnalyst(use_cache=True)
+    analyst.cache_dir = str(tmp_path)
+
+    # Execute
+    first = analyst.analyze_market("Same context")
+    second = analyst.analyze_market("Same context")
+    analyst.analyze_market("Different context")
+
+    # Verify: only new prompts reach the API
+    assert first == second
+    assert mock_client.models.generate_content.call_count == 2
+
+    # The async path shares the same cache entries
+    mock_client.aio.models.generate_content = AsyncMock()
+    replayed = analyst.analyze_markets([("Same context", "Market Open")])
+    assert replayed == [first]
+    mock_client.aio.models.generate_content.assert_not_awaited()
+
+
+def test_analysts_share_one_client(mock_genai):
+    # Execute
+    first = GeminiAnalyst()
+    second = GeminiAnalyst(model_name="gemini-3-pro-preview")
+
+    # Verify: a single client (and its connection pool) serves both
+    assert first.client is second.client
+    mock_genai.Client.assert_called_once()
+    assert "http_options" in mock_genai.Client.call_args.kwargs
+
+
+def test_analyze_market_escalates_low_confidence_trade(mock_genai):
+    # Setup
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+
+    def make_response(confidence):
+        return MockGeminiResponse(
+            json.dumps(
+                {
+                    "ticker": "FTSE100",
+                    "action": "BUY",
+                    "entry": 7510.0,
+                    "stop_loss": 7490.0,
+                    "take_profit": None,
+                    "size": 1.0,
+                    "atr": 15.0,
+                    "confidence": confidence,
+                    "reasoning": "Breakout.",
+                }
+            )
+        )
+
+    mock_client.models.generate_content.side_effect = [
+        make_response("low"),
+        make_response("high"),
+    ]
+
+    # Execute
+    analyst = GeminiAnalyst(escalation_model="gemini-3-pro-preview")
+    result = analyst.analyze_market("Context")
+
+    # Verify: the stronger model's answer is used
+    assert result.confidence == "high"
+    assert analyst.escalation_count == 1
+    models = [
+        c.kwargs["model"] for c in mock_client.models.generate_content.call_args_list
+    ]
+    assert models == ["gemini-3-flash-preview", "gemini-3-pro-preview"]
+
+
+def _trade_signal(confidence):
+    return {
+        "ticker": "FTSE100",
+        "action": "BUY",
+        "entry": 7510.0,
+        "stop_loss": 7490.0,
+        "take_profit": None,
+        "size": 1.0,
+        "atr": 15.0,
+        "confidence": confidence,
+        "reasoning": "Breakout.",
+    }
+
+
+def test_analyze_markets_escalates_low_confidence_trade_async(mock_genai):
+    # Setup
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    mock_client.aio.models.generate_content = AsyncMock(
+        side_effect=[
+            MockGeminiResponse(json.dumps(_trade_signal("low"))),
+            MockGeminiResponse(json.dumps(_trade_signal("high"))),
+        ]
+    )
+
+    # Execute
+    analyst = GeminiAnalyst(escalation_model="gemini-3-pro-preview")
+    results = analyst.analyze_markets([("Context", "Market Open")])
+
+    # Verify: escalated on the aio transport, never the blocking one
+    assert results[0].confidence == "high"
+    assert analyst.escalation_count == 1
+    models = [
+        c.kwargs["model"]
+        for c in mock_client.aio.models.generate_content.await_args_list
+    ]
+    assert models == ["gemini-3-flash-preview", "gemini-3-pro-preview"]
+    mock_client.models.generate_content.assert_not_called()
+
+
+def test_analyze_markets_batch_escalates_low_confidence_trade(mock_genai):
+    # Setup: one confident and one low-confidence signal in the batch
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    mock_client.models.generate_content.side_effect = [
+        MockGeminiResponse(json.dumps([_trade_signal("high"), _trade_signal("low")])),
+        MockGeminiResponse(json.dumps(_trade_signal("medium"))),
+    ]
+
+    # Execute
+    analyst = GeminiAnalyst(escalation_model="gemini-3-pro-preview")
+    results = analyst.analyze_markets_batch([("A", "S1"), ("B", "S2")])
+
+    # Verify: only the low-confidence signal was re-analyzed
+    assert [r.confidence for r in results] == ["high", "medium"]
+    assert analyst.escalation_count == 1
+    escalated = mock_client.models.generate_content.call_args
+    assert escalated.kwargs["model"] == "gemini-3-pro-preview"
+    assert "B" in escalated.kwargs["contents"]
+
+
+def test_system_instruction_is_byte_stable():
+    # The instruction is the cached prompt prefix; any byte change (even
+    # whitespace) invalidates the cache. Update the pin when editing on purpose.
+    assert ANALYST_SYSTEM_INSTRUCTION == ANALYST_SYSTEM_INSTRUCTION.strip()
+    assert ANALYST_SYSTEM_INSTRUCTION.startswith("You are a Senior Momentum Trader")
+    assert all(
+        line == line.rstrip() for line in ANALYST_SYSTEM_INSTRUCTION.splitlines()
+    )
+    assert (
+        hashlib.blake2b(ANALYST_SYSTEM_INSTRUCTION.encode(), digest_size=16).hexdigest()
+        == "16985906405075c410740217be849eae"
+    )
+
+
+def test_generate_post_mortem_marks_truncated_report(mock_genai):
+    # Setup
+    mock_client = MagicMock()
+    mock_genai.Client.return_value = mock_client
+    response = MockGeminiResponse("- Stop was too tight.")
+    response.candidates[0].finish_reason = types.FinishReason.MAX_TOKENS
+    mock_client.models.generate_content.return_value = response
+
+    # Execute
+    analyst = GeminiAnalyst()
+    report = analyst.generate_post_mortem({"log": {"entry": 100.0}})
+
+    # Verify
+    assert report == "- Stop was too tight.\n[TRUNCATED]"
@@ -1,13 +1,19 @@
 import pytest
 from unittest.mock import MagicMock, patch
+from src import gemini_analyst
 from src.gemini_analyst import GeminiAnalyst
-from google.genai import errors
+from google.genai import errors, types
 
 
 @pytest.fixture
 def mock_genai_retry():
+    # Clients and context caches are shared module-wide; start each test without one
+    gemini_analyst._CLIENTS.clear()
+    gemini_analyst._CONTEXT_CACHES.clear()
     with patch("src.gemini_analyst.genai") as mock:
         yield mock
+    gemini_analyst._CLIENTS.clear()
+    gemini_analyst._CONTEXT_CACHES.clear()
 
 
 def test_analyze_market_retries_on_503(mock_genai_retry):
@@ -88,3 +94,113 @@ def test_analyze_market_fails_after_all_retries(mock_genai_retry):
 
     # tenacity tries twice (stop_after_attempt(2)), so 2 calls total
     assert mock_client.models.generate_content.call_count == 2
+
+
+def test_analyze_market_retries_on_rate_limit(mock_genai_retry):
+    """
+    Verifies that a 429 (rate limit) is retried, while other 4xx errors are not.
+    """
+    mock_client = MagicMock()
+    mock_genai_retry.Client.return_value = mock_client
+
+    rate_limited = errors.ClientError(
+        429, response_json={"error": {"status": "RESOURCE_EXHAUSTED"}}
+    )
+    mock_client.models.generate_content.side_effect = rate_limited
+
+    analyst = GeminiAnalyst()
+
+    with patch("tenacity.nap.time.sleep", return_value=None):
+        with pytest.raises(errors.ClientError):
+            analyst.analyze_market("Context")
+    assert mock_client.models.generate_content.call_count == 2
+
+    # A bad request is final: no retry, analysis returns None
+    mock_client.models.generate_content.reset_mock()
+    mock_client.models.generate_content.side_effect = errors.ClientError(
+        400, response_json={"error": {"status": "INVALID_ARGUMENT"}}
+    )
+    with patch("tenacity.nap.time.sleep", return_value=None):
+        assert analyst.analyze_market("Context") is None
+    assert mock_client.models.generate_content.call_count == 1
+
+
+def test_analyze_market_does_not_retry_blocked_response(mock_genai_retry):
+    """
+    Verifies that an empty response blocked for RECITATION is final, not retried.
+    """
+    mock_client = MagicMock()
+    mock_genai_retry.Client.return_value = mock_client
+
+    mock_candidate = MagicMock()
+    mock_candidate.finish_reason = types.FinishReason.RECITATION
+    mock_candidate.content.parts = []
+    mock_response = MagicMock()
+    mock_response.text = None
+    mock_response.candidates = [mock_candidate]
+    mock_client.models.generate_content.return_value = mock_response
+
+    analyst = GeminiAnalyst()
+
+    with patch("tenacity.nap.time.sleep", return_value=None):
+        assert analyst.analyze_market("Context") is None
+    assert mock_client.models.generate_content.call_count == 1
+
+
+def test_stream_post_mortem_retries_before_first_chunk(mock_genai_retry):
+    """
+    A 503 while opening the stream is retried; the retried stream is complete.
+    """
+    mock_client = MagicMock()
+    mock_genai_retry.Client.return_value = mock_client
+
+    part = MagicMock(thought=False, text="- Plan followed.")
+    candidate = MagicMock(finish_reason=types.FinishReason.STOP, safety_ratings=None)
+    candidate.content.parts = [part]
+    chunk = MagicMock()
+    chunk.candidates = [candidate]
+
+    def failing_stream():
+        raise errors.ServerError(503, {"error": {"message": "Overloaded"}})
+        yield  # pragma: no cover
+
+    mock_client.models.generate_content_stream.side_effect = [
+        failing_stream(),
+        iter([chunk]),
+    ]
+
+    analyst = GeminiAnalyst()
+    with patch("tenacity.nap.time.sleep", return_value=None):
+        chunks = list(analyst.stream_post_mortem({"log": {"entry": 100.0}}))
+
+    assert chunks == ["- Plan followed."]
+    assert analyst.last_post_mortem_complete is True
+    assert mock_client.models.generate_content_stream.call_count == 2
+
+
+def test_stream_post_mortem_does_not_retry_after_first_chunk(mock_genai_retry):
+    """
+    Once text has been yielded, a failure ends the stream instead of replaying it.
+    """
+    mock_client = MagicMock()
+    mock_genai_retry.Client.return_value = mock_client
+
+    part = MagicMock(thought=False, text="- Plan followed.")
+    candidate = MagicMock(finish_reason=None, safety_ratings=None)
+    candidate.content.parts = [part]
+    chunk = MagicMock()
+    chunk.candidates = [candidate]
+
+    def broken_stream():
+        yield chunk
+        raise errors.ServerError(503, {"error": {"message": "Overloaded"}})
+
+    mock_client.models.generate_content_stream.return_value = broken_stream()
+
+    analyst = GeminiAnalyst()
+    with patch("tenacity.nap.time.sleep", return_value=None):
+        chunks = list(analyst.stream_post_mortem({"log": {"entry": 100.0}}))
+
+    assert chunks == ["- Plan followed.", "\n[Analysis interrupted.]"]
+    assert analyst.last_post_mortem_complete is False
+    mock_client.models.generate_content_stream.assert_called_once()
@@ -1,7 +1,16 @@
+import os
+import time
+from datetime import datetime, timedelta
 import pytest
 from unittest.mock import MagicMock, patch
 import pandas as pd
-from src.ig_client import IGClient
+import requests
+from src.ig_client import (
+    HIST_CACHE_TTL_SECONDS,
+    HIST_EMPTY_CACHE_TTL_SECONDS,
+    IGClient,
+)
+from trading_ig.rest import IGException
 import config  # Import config to patch IG_ACC_ID
 
 
@@ -15,10 +24,8 @@ def mock_ig_service():
 def reset_singleton():
     """Resets the IGClient singleton state before each test."""
     IGClient._instance = None
-    IGClient._initialized = False
     yield
     IGClient._instance = None
-    IGClient._initialized = False
 
 
 def test_authenticate_success(mock_ig_service):
@@ -249,8 +256,8 @@ def test_close_open_position_success(mock_ig_service):
     mock_instance.close_open_position.assert_called_once_with(
         deal_id="DEAL123",
         direction="SELL",
-        epic="CS.D.FTSE.TODAY.IP",
-        expiry="DFB",
+        epic=None,
+        expiry=None,
         level=None,
         order_type="MARKET",
         quote_id=None,
@@ -271,3 +278,481 @@ def test_close_open_position_fail(mock_ig_service):
         client.close_open_position(
             deal_id="DEAL123", direction="SELL", size=1, epic="CS.D.FTSE.TODAY.IP"
         )
+
+
+def test_singleton_reset_reinitialises_and_registers_close_once(mock_ig_service):
+    with patch("src.ig_client.atexit") as mock_atexit:
+        first = IGClient()
+        assert IGClient() is first
+        mock_atexit.register.assert_called_once_with(first.close)
+
+        # A fresh instance builds its own services and its own exit hook
+        IGClient._instance = None
+        second = IGClient()
+
+    assert second is not first
+    assert second.authenticated is False
+    assert mock_ig_service.call_count == 2
+    assert mock_atexit.register.call_count == 2
+
+
+def test_sessions_mount_pooled_adapter(mock_ig_service):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+
+    client = IGClient()
+
+    mounted = {
+        call.args[0]: call.args[1]
+        for call in mock_instance.session.mount.call_args_list
+    }
+    assert set(mounted) == {"https://", "http://"}
+    assert mounted["https://"]._pool_maxsize == 50
+    retries = mounted["https://"].max_retries
+    assert retries.allowed_methods == frozenset({"GET"})
+    # Only connection failures are retried here; ig_retry handles the rest
+    assert retries.connect == 2
+    assert retries.read == 0 and retries.status == 0
+    assert not retries.status_forcelist
+    assert retries.respect_retry_after_header is False
+
+    client.close()
+    mock_instance.session.close.assert_called_once()
+
+
+def test_fetch_historical_data_by_range_caches_closed_ranges(mock_ig_service, tmp_path):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+    prices = pd.DataFrame(
+        {"Open": [1.0], "High": [2.0], "Low": [0.5], "Close": [1.5]},
+        index=pd.to_datetime(["2024-01-02 08:00"]),
+    )
+    mock_instance.fetch_historical_prices_by_epic_and_date_range.side_effect = (
+        lambda *args: {"prices": prices.copy()}
+    )
+
+    with patch("src.ig_client.HIST_CACHE_DIR", tmp_path):
+        client = IGClient()
+        client.authenticated = True
+
+        first = client.fetch_historical_data_by_range(
+            "EPIC", "1Min", "2024-01-02 08:00:00", "2024-01-02 09:00:00"
+        )
+        second = client.fetch_historical_data_by_range(
+            "EPIC", "1Min", "2024-01-02 08:00:00", "2024-01-02 09:00:00"
+        )
+        # A range ending in the future is still forming, so it is only cached
+        # for one bar
+        client.fetch_historical_data_by_range(
+            "EPIC", "1Min", "2024-01-02 08:00:00", "2999-01-01 00:00:00"
+        )
+
+    pd.testing.assert_frame_equal(first, second)
+    assert list(second.columns) == ["open", "high", "low", "close"]
+    assert mock_instance.fetch_historical_prices_by_epic_and_date_range.call_count == 2
+
+
+def test_hist_cache_entry_waits_for_bars_to_settle_and_keys_by_source(
+    mock_ig_service, tmp_path
+):
+    client = IGClient()
+    recent_end = (datetime.now() - timedelta(minutes=2)).strftime("%Y-%m-%d %H:%M:%S")
+
+    with patch("src.ig_client.HIST_CACHE_DIR", tmp_path):
+        # Ended two 1-minute bars ago: IG may still revise it, so one bar only
+        _, recent_ttl = client._hist_cache_entry(
+            "EPIC", "1Min", "2024-01-02", recent_end
+        )
+
+        demo_path, closed_ttl = client._hist_cache_entry(
+            "EPIC", "1Min", "2024-01-02 08:00:00", "2024-01-02 09:00:00"
+        )
+        client.live_data_config = {"IG_ACC_ID": "LIVE1"}
+        live_path, _ = client._hist_cache_entry(
+            "EPIC", "1Min", "2024-01-02 08:00:00", "2024-01-02 09:00:00"
+        )
+
+    assert recent_ttl == 60
+    assert closed_ttl == HIST_CACHE_TTL_SECONDS
+    assert demo_path != live_path
+
+
+def test_fetch_historical_data_by_range_caches_empty_closed_ranges(
+    mock_ig_service, tmp_path
+):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+    mock_instance.fetch_historical_prices_by_epic_and_date_range.side_effect = (
+        lambda *args: {"prices": pd.DataFrame()}
+    )
+
+    with patch("src.ig_client.HIST_CACHE_DIR", tmp_path):
+        client = IGClient()
+        client.authenticated = True
+        for _ in range(2):
+            df = client.fetch_historical_data_by_range(
+                "EPIC", "1Min", "2024-01-06 08:00:00", "2024-01-06 09:00:00"
+            )
+
+    assert df.empty
+    mock_instance.fetch_historical_prices_by_epic_and_date_range.assert_called_once()
+
+
+def test_fetch_historical_data_by_range_expires_empty_ranges(mock_ig_service, tmp_path):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+    mock_instance.fetch_historical_prices_by_epic_and_date_range.side_effect = (
+        lambda *args: {"prices": pd.DataFrame()}
+    )
+    args = ("EPIC", "1Min", "2024-01-06 08:00:00", "2024-01-06 09:00:00")
+
+    with patch("src.ig_client.HIST_CACHE_DIR", tmp_path):
+        client = IGClient()
+        client.authenticated = True
+        client.fetch_historical_data_by_range(*args)
+
+        # Age the empty marker past its TTL (a non-empty range would still be fresh)
+        (cache_file,) = tmp_path.iterdir()
+        stale = time.time() - HIST_EMPTY_CACHE_TTL_SECONDS - 1
+        os.utime(cache_file, (stale, stale))
+        client.fetch_historical_data_by_range(*args)
+
+    assert mock_instance.fetch_historical_prices_by_epic_and_date_range.call_count == 2
+
+
+def test_process_historical_df_downcasts_losslessly(mock_ig_service):
+    client = IGClient()
+    df = pd.DataFrame(
+        {
+            "Open": [7510.5, 7511.25],
+            "High": [38123.4, 38124.1],
+            "Low": [7500.0, 7501.0],
+            "Close": [7505.75, 7506.0],
+            "Volume": [12.0, 40.0],
+        }
+    )
+
+    result = client._process_historical_df(df)
+
+    assert result["open"].dtype == "float32"
+    # Not exactly representable in float32, so left as float64
+    assert result["high"].dtype == "float64"
+    assert result["high"].iloc[0] == 38123.4
+    assert result["volume"].dtype == "int32"
+
+
+def test_process_historical_df_keeps_typical_index_prices_exact(mock_ig_service):
+    client = IGClient()
+    # pandas' downcast="float" would accept 7505.3 as 7505.2998046875
+    df = pd.DataFrame(
+        {
+            "Open": [7505.3, 7506.0],
+            "High": [7507.1, 7508.0],
+            "Low": [7504.9, 7505.0],
+            "Close": [7505.3, 7506.5],
+        }
+    )
+
+    result = client._process_historical_df(df)
+
+    assert result["open"].dtype == "float64"
+    assert result["open"].iloc[0] == 7505.3
+    assert "7505.299" not in result.to_string()
+
+
+def test_process_historical_df_flattens_multiindex(mock_ig_service):
+    client = IGClient()
+    cols = pd.MultiIndex.from_tuples(
+        [
+            ("bid", "Open"),
+            ("bid", "Close"),
+            ("ask", "Open"),
+            ("ask", "Close"),
+            ("last", "Volume"),
+            ("Volume", ""),
+        ]
+    )
+    df = pd.DataFrame([[1.0, 2.0, 3.0, 4.0, 5.0, 6.0]], columns=cols)
+
+    result = client._process_historical_df(df)
+
+    assert list(result.columns) == ["open", "close", "volume"]
+    assert result["open"].iloc[0] == 1.0
+    assert result["volume"].iloc[0] == 6
+
+
+def test_fetch_open_position_by_deal_id_uses_short_lived_index(mock_ig_service):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+    mock_instance.fetch_open_positions.return_value = pd.DataFrame(
+        [
+            {"dealId": "DEAL1", "size": 1.0},
+            {"dealId": "DEAL2", "size": 2.0},
+        ]
+    )
+
+    client = IGClient()
+    client.authenticated = True
+
+    assert client.fetch_open_position_by_deal_id("DEAL2")["size"] == 2.0
+    assert client.fetch_open_position_by_deal_id("DEAL1")["size"] == 1.0
+    assert client.fetch_open_position_by_deal_id("MISSING") is None
+    mock_instance.fetch_open_positions.assert_called_once()
+
+    # Changing a position drops the snapshot so the next lookup refetches
+    client.update_open_position("DEAL1", stop_level=100.0)
+    client.fetch_open_position_by_deal_id("DEAL1")
+    assert mock_instance.fetch_open_positions.call_count == 2
+
+
+def test_ig_retry_honours_retry_after(mock_ig_service):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+
+    rate_limited = IGException("HTTP error: 429")
+    rate_limited.response = MagicMock(headers={"Retry-After": "7"})
+    mock_instance.fetch_historical_prices_by_epic_and_num_points.side_effect = [
+        rate_limited,
+        {"prices": pd.DataFrame({"Close": [1.0]})},
+    ]
+
+    client = IGClient()
+    client.authenticated = True
+
+    with patch.object(IGClient.fetch_historical_data.retry, "sleep") as mock_sleep:
+        df = client.fetch_historical_data("EPIC", "1Min", 1)
+
+    mock_sleep.assert_called_once_with(7.0)
+    assert df["close"].iloc[0] == 1.0
+
+
+def test_get_market_info_reuses_recent_snapshot(mock_ig_service):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+    mock_instance.fetch_market_by_epic.return_value = {
+        "snapshot": {"bid": 100.0, "offer": 101.0}
+    }
+
+    client = IGClient()
+    client.authenticated = True
+
+    first = client.get_market_info("EPIC")
+    assert client.get_market_info("EPIC") is first
+    mock_instance.fetch_market_by_epic.assert_called_once_with("EPIC")
+
+    client.invalidate_market_info("EPIC")
+    client.get_market_info("EPIC")
+    assert mock_instance.fetch_market_by_epic.call_count == 2
+
+
+def test_live_env_parsed_once_and_trimmed(mock_ig_service, tmp_path):
+    from src import ig_client
+
+    (tmp_path / ".env.live").write_text(
+        "IS_LIVE=true\nIG_USERNAME=live_user\nIG_PASSWORD=pw\n"
+        "IG_API_KEY=key\nIG_ACC_ID=LIVE1\nGEMINI_API_KEY=unrelated\n"
+    )
+    ig_client._load_live_env.cache_clear()
+
+    with (
+        patch("src.ig_client.ROOT_DIR", tmp_path),
+        patch("src.ig_client.IS_LIVE", False),
+        patch("src.ig_client.dotenv_values", wraps=ig_client.dotenv_values) as dv,
+    ):
+        client = IGClient()
+        IGClient._instance = None
+        IGClient()
+
+    ig_client._load_live_env.cache_clear()
+    dv.assert_called_once()
+    assert client.live_data_config["IG_USERNAME"] == "live_user"
+    assert "GEMINI_API_KEY" not in client.live_data_config
+
+
+def test_authenticate_logs_in_trading_and_data_services(mock_ig_service, tmp_path):
+    from src import ig_client
+
+    trading, data = MagicMock(), MagicMock()
+    mock_ig_service.side_effect = [trading, data]
+    for service, acc_id in ((trading, "DEMO1"), (data, "LIVE1")):
+        service.fetch_accounts.return_value = pd.DataFrame(
+            [{"accountId": acc_id, "accountType": "SPREADBET", "preferred": True}]
+        )
+
+    (tmp_path / ".env.live").write_text("IS_LIVE=true\nIG_ACC_ID=LIVE1\n")
+    ig_client._load_live_env.cache_clear()
+    with (
+        patch("src.ig_client.ROOT_DIR", tmp_path),
+        patch("src.ig_client.IS_LIVE", False),
+        patch("src.ig_client.IG_ACC_ID", "DEMO1"),
+    ):
+        client = IGClient()
+        client.authenticate()
+    ig_client._load_live_env.cache_clear()
+
+    assert client.authenticated is True
+    assert trading.account_id == "DEMO1"
+    assert data.account_id == "LIVE1"
+
+
+def test_fetch_historical_data_many_returns_frame_per_epic(mock_ig_service):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+    mock_instance.fetch_historical_prices_by_epic_and_num_points.side_effect = (
+        lambda epic, resolution, num_points: {
+            "prices": pd.DataFrame({"Close": [float(len(epic))]})
+        }
+    )
+
+    client = IGClient()
+    client.authenticated = True
+
+    frames = client.fetch_historical_data_many(["A", "BB", "CCC"], "D", 1)
+
+    assert list(frames) == ["A", "BB", "CCC"]
+    assert [df["close"].iloc[0] for df in frames.values()] == [1.0, 2.0, 3.0]
+
+
+def test_place_spread_bet_order_sends_market_order(mock_ig_service):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+    mock_instance.create_open_position.return_value = {"dealReference": "REF1"}
+    mock_instance.fetch_deal_by_deal_reference.return_value = {
+        "dealStatus": "ACCEPTED",
+        "dealId": "DEAL1",
+    }
+
+    client = IGClient()
+    client.authenticated = True
+
+    confirmation = client.place_spread_bet_order(
+        epic="EPIC", direction="BUY", size=1.5, stop_level=90.0, limit_level=120.0
+    )
+
+    assert confirmation["dealId"] == "DEAL1"
+    kwargs = mock_instance.create_open_position.call_args.kwargs
+    assert kwargs["currency_code"] == "GBP"
+    assert kwargs["expiry"] == "DFB"
+    assert kwargs["order_type"] == "MARKET"
+    assert kwargs["level"] is None
+    assert (kwargs["direction"], kwargs["size"], kwargs["stop_level"]) == (
+        "BUY",
+        1.5,
+        90.0,
+    )
+    assert kwargs["limit_level"] == 120.0
+
+
+def test_close_open_position_sends_deal_id_or_epic_not_both(mock_ig_service):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+
+    client = IGClient()
+    client.authenticated = True
+
+    client.close_open_position("DEAL1", "SELL", 1.0, epic="EPIC")
+    by_deal = mock_instance.close_open_position.call_args.kwargs
+    assert by_deal["deal_id"] == "DEAL1"
+    assert by_deal["epic"] is None and by_deal["expiry"] is None
+    assert by_deal["order_type"] == "MARKET"
+
+    client.close_open_position(None, "BUY", 2.0, epic="EPIC")
+    by_epic = mock_instance.close_open_position.call_args.kwargs
+    assert by_epic["deal_id"] is None
+    assert (by_epic["epic"], by_epic["expiry"]) == ("EPIC", "DFB")
+
+
+def test_ig_retry_covers_request_timeouts(mock_ig_service):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+    mock_instance.fetch_market_by_epic.side_effect = [
+        requests.exceptions.ReadTimeout("read timed out"),
+        {"snapshot": {"bid": 1.0, "offer": 2.0}},
+    ]
+
+    client = IGClient()
+    client.authenticated = True
+
+    with patch.object(IGClient.get_market_info.retry, "sleep"):
+        info = client.get_market_info("EPIC")
+
+    assert info["snapshot"]["bid"] == 1.0
+    assert mock_instance.fetch_market_by_epic.call_count == 2
+
+
+def test_sessions_default_request_timeout(mock_ig_service):
+    mock_instance = MagicMock()
+    raw_request = mock_instance.session.request
+    mock_ig_service.return_value = mock_instance
+
+    client = IGClient()
+    client.service.session.request("GET", "https://example.test")
+    client.service.session.request("GET", "https://example.test", timeout=30)
+
+    assert raw_request.call_args_list[0].kwargs["timeout"] == 10
+    assert raw_request.call_args_list[1].kwargs["timeout"] == 30
+
+
+def test_place_spread_bet_order_repolls_unsettled_confirmation(mock_ig_service):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+    mock_instance.create_open_position.return_value = {"dealReference": "REF1"}
+    mock_instance.fetch_deal_by_deal_reference.side_effect = [
+        {"dealStatus": "UNKNOWN"},
+        {"dealStatus": "ACCEPTED", "dealId": "DEAL1"},
+    ]
+
+    client = IGClient()
+    client.authenticated = True
+
+    # Only ig_client's reference to time is wrapped, not the global time.sleep
+    with patch("src.ig_client.time", wraps=time) as mock_time:
+        confirmation = client.place_spread_bet_order(
+            epic="EPIC", direction="BUY", size=1.0, stop_level=90.0
+        )
+
+    assert confirmation["dealId"] == "DEAL1"
+    assert mock_instance.fetch_deal_by_deal_reference.call_count == 2
+    mock_time.sleep.assert_called_once_with(0.02)
+
+
+def test_place_spread_bet_order_drops_positions_cached_during_confirm(
+    mock_ig_service,
+):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+    mock_instance.create_open_position.return_value = {"dealReference": "REF1"}
+    mock_instance.fetch_open_positions.side_effect = [
+        {"positions": []},
+        {"positions": [{"position": {"dealId": "DEAL1"}}]},
+    ]
+
+    client = IGClient()
+    client.authenticated = True
+
+    def confirm(deal_ref):
+        # A monitor thread refreshes positions before IG lists the new deal
+        assert client.fetch_open_position_by_deal_id("DEAL1") is None
+        return {"dealStatus": "ACCEPTED", "dealId": "DEAL1"}
+
+    mock_instance.fetch_deal_by_deal_reference.side_effect = confirm
+
+    client.place_spread_bet_order(
+        epic="EPIC", direction="BUY", size=1.0, stop_level=90.0
+    )
+
+    assert client.fetch_open_position_by_deal_id("DEAL1") is not None
+    assert mock_instance.fetch_open_positions.call_count == 2
+
+
+def test_fetch_historical_data_zero_points_skips_ig(mock_ig_service):
+    mock_instance = MagicMock()
+    mock_ig_service.return_value = mock_instance
+
+    client = IGClient()
+    df = client.fetch_historical_data("EPIC", "1Min", 0)
+
+    assert df.empty
+    assert list(df.columns) == ["open", "high", "low", "close", "volume"]
+    mock_instance.create_session.assert_not_called()
+    mock_instance.fetch_historical_prices_by_epic_and_num_points.assert_not_called()
@@ -5,7 +5,7 @@ import os
 import tempfile
 from src.strategy_engine import StrategyEngine
 from src.gemini_analyst import TradingSignal, Action, EntryType
-from src.database import init_db, get_db_connection
+from src.database import init_db, get_db_connection, close_db
 from src.trade_logger_db import TradeLoggerDB
 
 
@@ -15,6 +15,7 @@ def test_db():
         db_path = temp_db.name
     init_db(db_path)
     yield db_path
+    close_db(db_path)
     os.remove(db_path)
 
 
@@ -58,7 +59,6 @@ def test_timeout_logging(test_db):
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM trade_log WHERE outcome = ?", ("TIMED_OUT",))
     timed_out_trade = cursor.fetchone()
-    conn.close()
 
     assert timed_out_trade is not None
     assert timed_out_trade["outcome"] == "TIMED_OUT"
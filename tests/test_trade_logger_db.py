@@ -50,8 +50,9 @@ class TestTradeLoggerDB(unittest.TestCase):
         self.assertEqual(params[13], 5.0)  # atr
         self.assertEqual(params[15], "DEAL123")  # deal_id
 
-        mock_conn.commit.assert_called_once()
-        mock_conn.close.assert_called_once()
+        # Committed (or rolled back) by the connection's context manager
+        mock_conn.__exit__.assert_called_once()
+        mock_conn.close.assert_not_called()
 
     @patch("src.trade_logger_db.init_db")
     @patch("src.trade_logger_db.get_db_connection")